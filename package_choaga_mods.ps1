@@ -39,6 +39,17 @@ try {
         throw "ERROR: $taskSource not found!"
     }
 
+    # Copy shared support package used by the task
+    $supportSource = "src\tasks\choaga"
+    if (Test-Path $supportSource) {
+        $supportDest = Join-Path $tempDir "src\tasks\choaga"
+        New-Item -ItemType Directory -Path $supportDest -Force | Out-Null
+        Copy-Item -Path "$supportSource\*.py" -Destination $supportDest -Force
+        Write-Host "  ✓ Copied src/tasks/choaga/ support package" -ForegroundColor Green
+    } else {
+        throw "ERROR: $supportSource not found!"
+    }
+
     # 2. Copy mod/fish/ folder with all images
     Write-Host "`n[2/6] Copying mod/fish/ folder..." -ForegroundColor Cyan
     $modFishSource = "mod\fish"
@@ -123,11 +134,15 @@ INSTALLATION INSTRUCTIONS
    a) Copy AutoFishMultiSpotTask.py to:
       [your ok-dna folder]\src\tasks\fullauto\AutoFishMultiSpotTask.py
    
-   b) Copy the mod\fish\ folder to:
+   b) Copy the src\tasks\choaga\ folder to:
+      [your ok-dna folder]\src\tasks\choaga\
+      (Shared support code required by the task)
+   
+   c) Copy the mod\fish\ folder to:
       [your ok-dna folder]\mod\fish\
       (Make sure all PNG files are copied)
    
-   c) If assets folder exists, copy it to:
+   d) If assets folder exists, copy it to:
       [your ok-dna folder]\assets\
       (This is optional - only if assets were included)
 
@@ -111,6 +111,16 @@ def main():
         else:
             print("  ⚠ WARNING: SkillSpeedTask.py not found (optional)")
         
+        # Copy shared support package used by both tasks
+        support_source = working_dir / "src/tasks/choaga"
+        if support_source.exists():
+            support_dest = Path(temp_dir) / "src/tasks/choaga"
+            shutil.copytree(support_source, support_dest, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+            print("  ✓ Copied src/tasks/choaga/ support package")
+        else:
+            raise FileNotFoundError(f"ERROR: {support_source} not found!")
+        
         # 2. Copy mod/fish/ folder with all images
         print("\n[2/7] Copying mod/fish/ folder...")
         mod_fish_source = working_dir / "mod/fish"
@@ -192,11 +202,15 @@ def main():
    b) Copy SkillSpeedTask.py to:
       [your ok-dna folder]\\src\\tasks\\trigger\\SkillSpeedTask.py
    
-   c) Copy the mod\\fish\\ folder to:
+   c) Copy the src\\tasks\\choaga\\ folder to:
+      [your ok-dna folder]\\src\\tasks\\choaga\\
+      (Shared support code required by both tasks)
+   
+   d) Copy the mod\\fish\\ folder to:
       [your ok-dna folder]\\mod\\fish\\
       (Make sure all PNG files are copied)
    
-   d) If assets folder exists, copy it to:
+   e) If assets folder exists, copy it to:
       [your ok-dna folder]\\assets\\
       (This is optional - only if assets were included)
 
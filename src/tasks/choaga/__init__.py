@@ -0,0 +1,5 @@
+"""Shared support code for Choaga's mod tasks (fishing, skill speed).
+
+Modules in this package must not import ``ok`` so they can be used by the
+offline tools as well as by the tasks running inside ok-dna.
+"""
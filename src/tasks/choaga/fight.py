@@ -0,0 +1,316 @@
+"""Fish bar / fish icon detection for the fishing fight phase"""
+from collections import deque
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+# Detection result layout shared by all detectors (coordinates relative to the ROI):
+# ((has_bar, bar_center, bar_rect), (has_icon, icon_center, icon_rect), bar_area)
+EMPTY_DETECTION = ((False, None, None), (False, None, None), 0.0)
+
+DETECTOR_METHODS = ("contours", "projection")
+
+def _runs(profile: np.ndarray) -> list:
+    """[(start, end), ...] of the runs of non-zero entries in a 1-D projection"""
+    nonzero = np.flatnonzero(profile)
+    if nonzero.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(nonzero) != 1)
+    starts = [int(nonzero[0])] + nonzero[breaks + 1].tolist()
+    ends = (nonzero[breaks] + 1).tolist() + [int(nonzero[-1]) + 1]
+    return list(zip(starts, ends))
+
+
+class FishBarDetector:
+    """Finds the fish bar (largest bright blob) and the fish icon (small bright blob) in the fight ROI
+
+    method="contours" is the original findContours/moments detector.
+    method="projection" cuts the thresholded strip along its row and column
+    projections and only traces contours for pieces that are not a solid
+    bright rectangle, avoiding the per-contour work in the common frames;
+    has_bar/has_icon and the rects match the contour detector.
+
+    The detector runs every frame of the fight, so the scaled area limits are
+    cached per resolution and the grayscale / binary / projection images are
+    written into buffers preallocated per ROI shape (dst= in OpenCV calls)
+    instead of being allocated again for each frame.
+    """
+
+    BRIGHT_THRESHOLD = 200
+
+    def __init__(self, method: str = "contours", bar_min_area: float = 1200, icon_min_area: float = 70,
+                 icon_max_area: float = 400):
+        if method not in DETECTOR_METHODS:
+            raise ValueError(f"Unknown fish bar detector method: {method}")
+        self.method = method
+        self.bar_min_area = bar_min_area
+        self.icon_min_area = icon_min_area
+        self.icon_max_area = icon_max_area
+        self._limits_ratio = None
+        self._limits = None
+        self._buffer_shape = None
+        self._gray = self._binary = self._row_sum = self._col_sum = None
+
+    def limits(self, res_ratio: float) -> tuple:
+        """(icon_min, icon_max, bar_min) areas scaled by res_ratio ** 2, cached for the last resolution"""
+        if res_ratio != self._limits_ratio:
+            scale = res_ratio ** 2
+            self._limits = (self.icon_min_area * scale, self.icon_max_area * scale, self.bar_min_area * scale)
+            self._limits_ratio = res_ratio
+        return self._limits
+
+    def _buffers(self, shape: tuple):
+        """(Re)allocate the per-frame work images when the ROI size changes"""
+        if shape != self._buffer_shape:
+            height, width = shape
+            self._gray = np.empty((height, width), dtype=np.uint8)
+            self._binary = np.empty((height, width), dtype=np.uint8)
+            self._row_sum = np.empty((height, 1), dtype=np.int32)
+            self._col_sum = np.empty((1, width), dtype=np.int32)
+            self._buffer_shape = shape
+
+    def detect(self, gray: np.ndarray, res_ratio: float = 1.0):
+        """Detect bar and icon in a grayscale ROI, res_ratio = frame height / 1080 scales the area limits"""
+        self._buffers(gray.shape[:2])
+        cv2.threshold(gray, self.BRIGHT_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self._binary)
+        if self.method == "projection":
+            blobs = self._projection_blobs(self._binary)
+        else:
+            blobs = self._contour_blobs(self._binary)
+        return self._select(blobs, res_ratio)
+
+    def detect_frame(self, frame: np.ndarray, roi: tuple, res_ratio: float = 1.0):
+        """Detect bar and icon in the (x, y, w, h) roi of a BGR/BGRA frame
+
+        Only the ROI is converted to grayscale, into the preallocated buffer.
+        """
+        x, y, w, h = roi
+        crop = frame[y:y + h, x:x + w]
+        if crop.ndim == 2:
+            return self.detect(crop, res_ratio)
+        self._buffers(crop.shape[:2])
+        code = cv2.COLOR_BGRA2GRAY if crop.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        cv2.cvtColor(crop, code, dst=self._gray)
+        return self.detect(self._gray, res_ratio)
+
+    @staticmethod
+    def _contour_blobs(binary: np.ndarray) -> list:
+        """[(area, center, rect), ...] from findContours and moments"""
+        contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        blobs = []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            moments = cv2.moments(contour)
+            if moments["m00"] <= 0:
+                continue
+            center = (int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"]))
+            x, y, w, h = cv2.boundingRect(contour)
+            blobs.append((area, center, (x, y, x + w, y + h)))
+        return blobs
+
+    def _projection_blobs(self, binary: np.ndarray) -> list:
+        """[(area, center, rect), ...] from run-length segmentation of the row and column projections
+
+        The strip is cut into runs of rows containing bright pixels, and each
+        row run into runs of columns containing bright pixels. A piece that is
+        completely bright is one blob whose rect, centroid and area (the
+        cv2.contourArea convention, (w-1)*(h-1)) follow from its bounds. Any
+        other piece (the icon inside the bar behind a dark outline, noise, two
+        blobs stacked in different columns) goes through _contour_blobs, so
+        the result always matches the contour detector.
+        """
+        row_sum = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dst=self._row_sum, dtype=cv2.CV_32S).ravel()
+        col_buffer = self._col_sum
+
+        blobs = []
+        for y0, y1 in _runs(row_sum):
+            col_sum = cv2.reduce(binary[y0:y1], 0, cv2.REDUCE_SUM, dst=col_buffer, dtype=cv2.CV_32S).ravel()
+            h = y1 - y0
+            for x0, x1 in _runs(col_sum):
+                w = x1 - x0
+                if int(col_sum[x0:x1].sum()) == 255 * w * h:
+                    center = (x0 + (w - 1) // 2, y0 + (h - 1) // 2)
+                    blobs.append((float((w - 1) * (h - 1)), center, (x0, y0, x1, y1)))
+                    continue
+                for area, (cx, cy), (rx0, ry0, rx1, ry1) in self._contour_blobs(binary[y0:y1, x0:x1]):
+                    blobs.append((area, (cx + x0, cy + y0), (rx0 + x0, ry0 + y0, rx1 + x0, ry1 + y0)))
+        return blobs
+
+    def _select(self, blobs: list, res_ratio: float):
+        """Pick the bar (largest blob over bar_min_area) and the icon (next blob within the icon limits)"""
+        icon_min, icon_max, bar_min = self.limits(res_ratio)
+        blobs = [blob for blob in blobs if blob[0] > icon_min]
+        if not blobs:
+            return EMPTY_DETECTION
+        blobs.sort(key=lambda blob: blob[0], reverse=True)
+
+        bar = (False, None, None)
+        bar_area = 0.0
+        if blobs[0][0] > bar_min:
+            bar_area, bar_center, bar_rect = blobs[0]
+            bar = (True, bar_center, bar_rect)
+
+        icon = (False, None, None)
+        for area, center, rect in blobs:
+            if area == bar_area:
+                continue
+            if icon_min < area < icon_max:
+                icon = (True, center, rect)
+            break
+        return bar, icon, bar_area
+
+
+class FightObservation(NamedTuple):
+    """One detector result handed to a fight controller (coordinates relative to the fish ROI)"""
+    time: float
+    has_bar: bool
+    bar_center: tuple
+    bar_rect: tuple
+    has_icon: bool
+    icon_center: tuple
+    control_zone_ratio: float
+
+
+class FightController:
+    """Decides whether space should be held during the fight, one observation at a time
+
+    decide() returns True (hold), False (release) or None (keep the current
+    state). Controllers keep their own history and are reset for every fight.
+    """
+
+    name = "base"
+
+    def reset(self):
+        """Forget the state of the previous fight"""
+
+    def decide(self, observation: FightObservation):
+        raise NotImplementedError
+
+
+class BangBangController(FightController):
+    """The original rule: hold when the icon is above the control zone, release when below
+
+    While the icon is merged into the bar (bar visible, icon just vanished) the
+    side it was last seen on decides for merge_grace seconds.
+    """
+
+    name = "bang-bang"
+
+    def __init__(self, merge_grace: float = 0.20):
+        self.merge_grace = merge_grace
+        self.reset()
+
+    def reset(self):
+        self.icon_was_visible_prev = False
+        self.last_known_icon_y_relative = 0.0
+        self.merge_start_time = None
+        self.last_merge_event = None
+
+    @staticmethod
+    def control_zone(bar_rect: tuple, control_zone_ratio: float) -> tuple:
+        """(control_top, control_bottom) inside the bar"""
+        bar_top, bar_bottom = bar_rect[1], bar_rect[3]
+        bar_height = max(bar_bottom - bar_top, 1)
+        control_height = int(bar_height * control_zone_ratio)
+        return bar_top + control_height, bar_bottom - control_height
+
+    def decide(self, observation: FightObservation):
+        obs = observation
+        if obs.has_bar and obs.has_icon:
+            self.last_known_icon_y_relative = obs.icon_center[1] - obs.bar_center[1]
+        hold = self._decide(obs)
+        self.icon_was_visible_prev = obs.has_icon
+        return hold
+
+    def _decide(self, obs: FightObservation):
+        if not (obs.has_bar and obs.bar_rect):
+            return False
+        if obs.has_icon:
+            self.merge_start_time = None
+            return self._zone_rule(obs.icon_center[1], *self.control_zone(obs.bar_rect, obs.control_zone_ratio))
+        if self.icon_was_visible_prev:
+            if self.merge_start_time is None:
+                self.merge_start_time = obs.time
+                self.last_merge_event = f"merged, last_rel={self.last_known_icon_y_relative:.1f}"
+            if obs.time - self.merge_start_time <= self.merge_grace:
+                return self.last_known_icon_y_relative < 0
+        else:
+            self.merge_start_time = None
+        return None
+
+    @staticmethod
+    def _zone_rule(icon_y: float, control_top: float, control_bottom: float):
+        if icon_y < control_top:
+            return True
+        if icon_y > control_bottom:
+            return False
+        return None
+
+
+class PredictiveController(BangBangController):
+    """Bang-bang rule applied to where the icon and bar will be when the input lands
+
+    Icon and bar velocities are estimated with a least-squares fit over the
+    last `window` observations in which both were visible, and positions are
+    extrapolated by `latency` seconds (capture-to-input delay: detection,
+    decision and the key event reaching the game). Falls back to the plain
+    rule until enough history exists or when the icon is merged.
+    """
+
+    name = "predictive"
+
+    def __init__(self, merge_grace: float = 0.20, latency: float = 0.06, window: int = 5,
+                 max_history_age: float = 0.5):
+        self.latency = latency
+        self.window = max(2, window)
+        self.max_history_age = max_history_age
+        super().__init__(merge_grace)
+
+    def reset(self):
+        super().reset()
+        self.history = deque(maxlen=self.window)
+
+    @staticmethod
+    def _slope(times: list, values: list) -> float:
+        """Least-squares slope of values over times"""
+        n = len(times)
+        mean_t = sum(times) / n
+        mean_v = sum(values) / n
+        var = sum((t - mean_t) ** 2 for t in times)
+        if var <= 0:
+            return 0.0
+        return sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var
+
+    def velocities(self) -> tuple:
+        """(icon, bar top, bar bottom) velocities in ROI pixels per second"""
+        times = [sample[0] for sample in self.history]
+        return tuple(self._slope(times, [sample[i] for sample in self.history]) for i in (1, 2, 3))
+
+    def _decide(self, obs: FightObservation):
+        if not (obs.has_bar and obs.bar_rect and obs.has_icon):
+            self.history.clear()
+            return super()._decide(obs)
+        if self.history and obs.time - self.history[-1][0] > self.max_history_age:
+            self.history.clear()
+        self.history.append((obs.time, obs.icon_center[1], obs.bar_rect[1], obs.bar_rect[3]))
+        if len(self.history) < 3:
+            return super()._decide(obs)
+        self.merge_start_time = None
+        icon_v, top_v, bottom_v = self.velocities()
+        icon_y = obs.icon_center[1] + icon_v * self.latency
+        bar_rect = (obs.bar_rect[0], obs.bar_rect[1] + top_v * self.latency,
+                    obs.bar_rect[2], obs.bar_rect[3] + bottom_v * self.latency)
+        return self._zone_rule(icon_y, *self.control_zone(bar_rect, obs.control_zone_ratio))
+
+
+CONTROLLERS = {controller.name: controller for controller in (BangBangController, PredictiveController)}
+
+
+def create_controller(name: str = "bang-bang", **params) -> FightController:
+    """Instantiate a controller by name ("bang-bang" or "predictive")"""
+    try:
+        controller_class = CONTROLLERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown fight controller: {name}") from None
+    return controller_class(**params)
@@ -0,0 +1,159 @@
+"""Fused detector for the fishing HUD icons: cast / bite / ease slot and chance slot in one pass"""
+import json
+import logging
+import os
+from enum import Enum
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from src.tasks.choaga.vision import Template, get_match_executor, to_gray
+
+logger = logging.getLogger(__name__)
+
+HUD_REFERENCE = (3840, 2160)
+# COCO annotations of the game screenshots (the same boxes the per-icon find_one lookups use)
+HUD_ANNOTATIONS = "assets/result.json"
+# Screen slots (x1, y1, x2, y2) the icons show up in, and which icons each slot can hold
+HUD_SLOTS = {
+    "bite": (3147, 1566, 3383, 1797),
+    "chance": (3467, 1797, 3703, 2033),
+}
+ICON_SLOTS = {"fish_cast": "bite", "fish_bite": "bite", "fish_ease": "bite", "fish_chance": "chance"}
+BITE_SLOT_ICONS = ("fish_cast", "fish_bite", "fish_ease")
+
+
+class HudState(Enum):
+    NONE = "none"
+    CAST = "cast"  # fish_cast / fish_ease: cast (or reel) prompt
+    BITE = "bite"  # fish_bite: waiting for a bite
+    CHANCE = "chance"  # fish_chance: chance cast offered (the bite slot may show CAST as well)
+
+
+class HudReading(NamedTuple):
+    state: HudState
+    cast: bool
+    bite: bool
+    chance: bool
+    scores: dict  # icon -> best score
+    boxes: dict  # icon -> (x, y, w, h) in frame coordinates, for icons that reached the threshold
+
+    def center(self, icon: str) -> tuple:
+        box = self.boxes.get(icon)
+        if box is None:
+            return 0, 0
+        return box[0] + box[2] // 2, box[1] + box[3] // 2
+
+
+class HudDetector:
+    """Scores all four fishing HUD icons on one grayscale crop per frame
+
+    The bite and chance slots touch, so their bounding box is cropped and
+    converted to grayscale once; each icon template (cut from the annotated
+    screenshots, scaled to the frame height) is then matched only in its own
+    slot with TM_CCOEFF_NORMED on grayscale, so its scores are not the ones
+    of the per-icon find_one lookups. The bite slot shows one icon at a time,
+    so the best scoring icon at or above threshold decides between CAST and
+    BITE instead of probing the icons one by one. detect(frame, icons) scores
+    only the given icons and crops only their slots (e.g. BITE_SLOT_ICONS
+    while waiting for the reel prompt). parallel=True runs the matches on the
+    shared match thread pool (cv2.matchTemplate releases the GIL).
+    """
+
+    def __init__(self, templates: dict, threshold: float = 0.8, parallel: bool = False):
+        self.templates = templates  # icon -> Template at HUD_REFERENCE resolution
+        self.threshold = threshold
+        self.parallel = parallel
+        self._layouts = {}
+
+    @classmethod
+    def from_annotations(cls, path: str = HUD_ANNOTATIONS, **kwargs) -> "HudDetector":
+        """Detector with the icon templates cut from the annotated screenshots of a COCO file"""
+        with open(path, encoding="utf-8") as f:
+            coco = json.load(f)
+        categories = {category["id"]: category["name"] for category in coco["categories"]}
+        images = {image["id"]: image for image in coco["images"]}
+        folder = os.path.dirname(path)
+        screenshots = {}
+        templates = {}
+        for annotation in coco["annotations"]:
+            icon = categories.get(annotation["category_id"])
+            if icon not in ICON_SLOTS or icon in templates:
+                continue
+            image = images[annotation["image_id"]]
+            image_path = os.path.join(folder, image["file_name"])
+            if image_path not in screenshots:
+                screenshots[image_path] = Template.from_file(image_path).bgr
+            x, y, w, h = (round(v) for v in annotation["bbox"])
+            crop = screenshots[image_path][y:y + h, x:x + w]
+            if image["height"] != HUD_REFERENCE[1]:
+                scale = HUD_REFERENCE[1] / image["height"]
+                crop = cv2.resize(crop, (max(1, round(w * scale)), max(1, round(h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+            templates[icon] = Template(icon, image_path, crop.copy())
+        missing = [icon for icon in ICON_SLOTS if icon not in templates]
+        if missing:
+            raise ValueError(f"{path} has no annotation for {', '.join(missing)}")
+        return cls(templates, **kwargs)
+
+    def _layout(self, frame_shape, icons: tuple) -> tuple:
+        """(union crop, {slot: crop-relative slot}, {icon: scaled gray template}) for a frame size and icons"""
+        key = (frame_shape[:2], icons)
+        layout = self._layouts.get(key)
+        if layout is None:
+            height, width = frame_shape[:2]
+            sx, sy = width / HUD_REFERENCE[0], height / HUD_REFERENCE[1]
+            slots = {slot: (int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))
+                     for slot, (x1, y1, x2, y2) in HUD_SLOTS.items()
+                     if any(ICON_SLOTS[icon] == slot for icon in icons)}
+            x0 = min(s[0] for s in slots.values())
+            y0 = min(s[1] for s in slots.values())
+            x1 = max(s[2] for s in slots.values())
+            y1 = max(s[3] for s in slots.values())
+            relative = {slot: (sx1 - x0, sy1 - y0, sx2 - x0, sy2 - y0) for slot, (sx1, sy1, sx2, sy2) in slots.items()}
+            scaled = {}
+            for icon in icons:
+                template = self.templates[icon]
+                size = (max(1, round(template.width * sy)), max(1, round(template.height * sy)))
+                scaled[icon] = cv2.resize(template.gray, size, interpolation=cv2.INTER_AREA) if sy != 1 \
+                    else template.gray
+            layout = self._layouts[key] = ((x0, y0, x1, y1), relative, scaled)
+        return layout
+
+    def detect(self, frame: np.ndarray, icons=None) -> HudReading:
+        """Score the icons (all by default) on frame; icons that were not scored count as absent"""
+        icons = tuple(self.templates) if icons is None else tuple(icons)
+        (x0, y0, x1, y1), slots, templates = self._layout(frame.shape, icons)
+        gray = to_gray(frame[y0:y1, x0:x1])
+
+        def score(icon):
+            sx1, sy1, sx2, sy2 = slots[ICON_SLOTS[icon]]
+            area = gray[sy1:sy2, sx1:sx2]
+            template = templates[icon]
+            if area.shape[0] < template.shape[0] or area.shape[1] < template.shape[1]:
+                return 0.0, None
+            _, max_val, _, max_loc = cv2.minMaxLoc(cv2.matchTemplate(area, template, cv2.TM_CCOEFF_NORMED))
+            return max_val, (x0 + sx1 + max_loc[0], y0 + sy1 + max_loc[1], template.shape[1], template.shape[0])
+
+        if self.parallel:
+            results = list(get_match_executor().map(score, icons))
+        else:
+            results = [score(icon) for icon in icons]
+        scores = {icon: float(s) for icon, (s, _) in zip(icons, results)}
+        boxes = {icon: box for icon, (s, box) in zip(icons, results) if box is not None and s >= self.threshold}
+
+        slot_icons = [icon for icon in BITE_SLOT_ICONS if icon in boxes]
+        top = max(slot_icons, key=scores.get) if slot_icons else None
+        cast = top in ("fish_cast", "fish_ease")
+        bite = top == "fish_bite"
+        chance = "fish_chance" in boxes
+        if chance:
+            state = HudState.CHANCE
+        elif bite:
+            state = HudState.BITE
+        elif cast:
+            state = HudState.CAST
+        else:
+            state = HudState.NONE
+        return HudReading(state, cast, bite, chance, scores, boxes)
@@ -0,0 +1,111 @@
+"""Append-only JSONL ledger of fishing rounds and navigations, written by a background thread"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+LEDGER_VERSION = 1
+ROUND, NAVIGATION = "round", "navigation"
+# Round outcomes: the phase that failed, or caught
+CAUGHT, START_TIMEOUT, FIGHT_TIMEOUT, END_FAILED, NO_MORE_FISH = (
+    "caught", "start_timeout", "fight_timeout", "end_failed", "no_more_fish")
+
+
+class SessionLedger:
+    """Appends records (one JSON object per line) to a ledger file without blocking the caller
+
+    append() only puts the record on a queue; a writer thread collects up
+    to batch_size records, or whatever arrived within flush_interval
+    seconds, and appends them to the file in one write. Every record gets
+    the ledger version, the session id (one per SessionLedger) and its
+    wall-clock time. close() writes what is still queued. The file is only
+    ever appended to, so several sessions (and tools reading it) can share
+    it; a line cut short by a crash is skipped by read_ledger().
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0, batch_size: int = 50):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.session = uuid.uuid4().hex[:12]
+        self.written = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._tail_checked = False
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="fishing-ledger", daemon=True)
+        self._thread.start()
+
+    def append(self, kind: str, **fields):
+        if self._closed:
+            return
+        record = {"v": LEDGER_VERSION, "type": kind, "session": self.session, "time": round(time.time(), 3)}
+        record.update(fields)
+        self._queue.put(record)
+
+    def close(self, timeout: float = 5.0):
+        """Write the queued records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list):
+        lines = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in batch)
+        try:
+            if not self._tail_checked:
+                # Start on a new line when the previous session was cut off mid-record
+                self._tail_checked = True
+                if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                    with open(self.path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            lines = "\n" + lines
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.written += len(batch)
+        except OSError as e:
+            logger.warning(f"Cannot write {len(batch)} ledger records to {self.path}: {e}")
+
+
+def read_ledger(path: str, kind: str = None) -> list:
+    """Records of a ledger file (only those of the given type when kind is set)"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"{path}:{line_number}: skipping unreadable ledger line")
+                continue
+            if kind is None or record.get("type") == kind:
+                records.append(record)
+    return records
@@ -0,0 +1,207 @@
+"""Typed navigation actions and the interpreter that runs them on a task"""
+import logging
+from typing import Callable, NamedTuple
+
+from src.tasks.choaga.timing import DeadlineTimer, TimerCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class Press(NamedTuple):
+    key: str
+    down_time: float = 0.1
+
+
+class Hold(NamedTuple):
+    key: str
+    duration: float
+
+
+class Sleep(NamedTuple):
+    seconds: float
+
+
+class Click(NamedTuple):
+    x: int
+    y: int
+
+
+class MouseDown(NamedTuple):
+    x: int
+    y: int
+    button: str = "left"
+
+
+class MouseUp(NamedTuple):
+    button: str = "left"
+
+
+class WaitImage(NamedTuple):
+    """Wait until an image (template name) is on screen; required=False only waits up to timeout"""
+    name: str
+    timeout: float = 10.0
+    required: bool = True
+
+
+ACTION_TYPES = (Press, Hold, Sleep, Click, MouseDown, MouseUp, WaitImage)
+
+
+class NavigationError(Exception):
+    """A required WaitImage checkpoint did not appear"""
+
+
+def skip_preamble(actions: list) -> tuple[list, bool]:
+    """Drop the part of a recorded route the task already did before running it
+
+    Recordings start in the menus (ESC, clicks on the map / teleport). When
+    the route has a W press everything before it is dropped; otherwise the
+    first Sleep/ESC/Sleep sequence and the first three mouse clicks
+    (MouseDown, Sleep, MouseUp) are. Returns (actions, skipped to first W).
+    """
+    for i, action in enumerate(actions):
+        if isinstance(action, Press) and action.key.lower() == "w":
+            return list(actions[i:]), True
+
+    actions = list(actions)
+    for i in range(len(actions) - 2):
+        if (isinstance(actions[i], Sleep) and isinstance(actions[i + 2], Sleep)
+                and isinstance(actions[i + 1], Press) and actions[i + 1].key.lower() == "esc"):
+            del actions[i:i + 3]
+            break
+    removed, i = 0, 0
+    while i < len(actions) - 2 and removed < 3:
+        if (isinstance(actions[i], MouseDown) and isinstance(actions[i + 1], Sleep)
+                and isinstance(actions[i + 2], MouseUp)):
+            del actions[i:i + 3]
+            removed += 1
+        else:
+            i += 1
+    return actions, False
+
+
+def prepare_route(actions: list, first_w_hold: float = 2.0) -> tuple[list, bool]:
+    """Turn a recorded route into the one the task runs after teleporting
+
+    skip_preamble(), then the first remaining ESC is dropped (the menus are
+    already closed) and the first W press becomes a Hold of first_w_hold
+    seconds (walking off the teleport point).
+    """
+    actions, skipped = skip_preamble(actions)
+    result = []
+    esc_skipped = w_held = False
+    for action in actions:
+        if isinstance(action, Press):
+            key = action.key.lower()
+            if key == "esc" and not esc_skipped:
+                esc_skipped = True
+                continue
+            if key == "w" and not w_held:
+                w_held = True
+                action = Hold(action.key, first_w_hold)
+        result.append(action)
+    return result, skipped
+
+
+class NavigationInterpreter:
+    """Runs navigation actions on a task, owning timing, cancellation and input cleanup
+
+    Waits run on a DeadlineTimer: consecutive Sleeps are measured from the
+    previous deadline (no drift from sleeping in chunks), and each input is
+    followed by INPUT_SETTLE seconds measured from the end of the input.
+    The timer sleeps through task.sleep(), so disabling the task stops the
+    route between actions or in the middle of a Sleep / Hold. Keys and mouse
+    buttons still held when the route stops are released. cancel() is
+    checked before every action and during waits, and stops the route
+    quietly (run() returns False).
+    """
+
+    INPUT_SETTLE = 0.01
+
+    def __init__(self, task, wait_image: Callable = None, cancel: Callable = None):
+        self.task = task
+        self.wait_image = wait_image
+        self.cancel = cancel
+        self.timer = DeadlineTimer(task.sleep, cancel)
+        self._held_keys = set()
+        self._held_buttons = set()
+        self._handlers = {
+            Press: self._press,
+            Hold: self._hold,
+            Sleep: self._sleep,
+            Click: self._click,
+            MouseDown: self._mouse_down,
+            MouseUp: self._mouse_up,
+            WaitImage: self._wait_image,
+        }
+
+    def run(self, actions) -> bool:
+        """Execute the actions in order, True when all of them ran"""
+        self.timer.reset()
+        try:
+            for action in actions:
+                if self.cancel is not None and self.cancel():
+                    logger.info("navigation cancelled")
+                    return False
+                self._handlers[type(action)](action)
+            return True
+        except TimerCancelled:
+            logger.info("navigation cancelled")
+            return False
+        finally:
+            self.release_all()
+
+    def release_all(self):
+        for key in list(self._held_keys):
+            self.task.send_key_up(key)
+        for button in list(self._held_buttons):
+            self.task.mouse_up(key=button)
+        self._held_keys.clear()
+        self._held_buttons.clear()
+
+    def _press(self, action: Press):
+        logger.debug(f"Pressing key: {action.key}")
+        self.task.send_key(action.key, down_time=action.down_time)
+        self._settle()
+
+    def _hold(self, action: Hold):
+        logger.debug(f"Holding {action.key} for {action.duration}s")
+        self.task.send_key_down(action.key)
+        self._held_keys.add(action.key)
+        self.timer.reset()
+        self._wait(action.duration)
+        self.task.send_key_up(action.key)
+        self._held_keys.discard(action.key)
+        self._settle()
+
+    def _sleep(self, action: Sleep):
+        self._wait(action.seconds)
+
+    def _wait(self, seconds: float):
+        self.timer.wait(seconds)
+
+    def _settle(self):
+        """INPUT_SETTLE seconds from the end of the input just sent"""
+        self.timer.reset()
+        self.timer.wait(self.INPUT_SETTLE)
+
+    def _click(self, action: Click):
+        self.task.click(action.x, action.y)
+        self._settle()
+
+    def _mouse_down(self, action: MouseDown):
+        self.task.mouse_down(x=action.x, y=action.y, key=action.button)
+        self._held_buttons.add(action.button)
+        self._settle()
+
+    def _mouse_up(self, action: MouseUp):
+        self.task.mouse_up(key=action.button)
+        self._held_buttons.discard(action.button)
+        self._settle()
+
+    def _wait_image(self, action: WaitImage):
+        if self.wait_image is None:
+            raise NavigationError(f"no image waiter for {action.name}")
+        found = self.wait_image(action.name, action.timeout)
+        self.timer.reset()
+        if not found and action.required:
+            raise NavigationError(f"{action.name} did not appear within {action.timeout}s")
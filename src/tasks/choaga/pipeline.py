@@ -0,0 +1,109 @@
+"""Capture + detection worker thread for the pipelined fight loop"""
+import logging
+import threading
+import time
+from typing import Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Detection(NamedTuple):
+    """One detector result produced by the worker, timestamps from time.perf_counter()"""
+    seq: int
+    frame_time: float  # when the frame was received
+    detect_start: float
+    detect_time: float
+    result: object
+
+
+class DetectionPipeline:
+    """Runs grab() + detect(frame) in a worker thread and keeps only the newest result
+
+    The consumer calls latest() to get a detection newer than the last one it
+    saw. Results that were never consumed are overwritten (counted in
+    `dropped`), so the control loop always acts on the freshest frame instead
+    of working through a backlog. An exception raised in the worker (e.g. the
+    task being disabled while waiting for a frame) is re-raised by latest().
+
+    grab() and detect() run on the worker thread only. The caller must not
+    capture frames itself until stop() has returned: the worker checks the
+    stop flag before every grab and stop() waits up to `timeout` seconds for
+    it to exit. A worker stuck in grab() is logged and left behind (it is a
+    daemon thread) rather than hanging the caller.
+    """
+
+    def __init__(self, grab: Callable, detect: Callable, name: str = "fight-detector"):
+        self.grab = grab
+        self.detect = detect
+        self.name = name
+        self.dropped = 0
+        self.produced = 0
+        self._latest = None
+        self._consumed_seq = 0
+        self._error = None
+        self._stop = threading.Event()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self) -> "DetectionPipeline":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> bool:
+        """Ask the worker to exit and wait up to timeout seconds until it has, returns whether it did
+
+        The worker finishes the grab / frame it is working on before it exits.
+        """
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        stopped = True
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"{self.name} worker did not exit within {timeout}s, leaving it behind")
+                stopped = False
+        self._thread = None
+        return stopped
+
+    def _run(self):
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                frame = self.grab()
+                frame_time = time.perf_counter()
+                if self._stop.is_set():
+                    break
+                detect_start = time.perf_counter()
+                result = self.detect(frame)
+                seq += 1
+                detection = Detection(seq, frame_time, detect_start, time.perf_counter() - detect_start, result)
+                with self._condition:
+                    if self._latest is not None and self._latest.seq > self._consumed_seq:
+                        self.dropped += 1
+                    self._latest = detection
+                    self.produced = seq
+                    self._condition.notify_all()
+        except BaseException as e:
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+            if not self._stop.is_set():
+                logger.debug(f"{self.name} stopped: {e!r}")
+
+    def latest(self, timeout: float = 1.0):
+        """Newest unseen Detection, waiting up to timeout for one; None on timeout"""
+        deadline = time.perf_counter() + timeout
+        with self._condition:
+            while True:
+                if self._latest is not None and self._latest.seq > self._consumed_seq:
+                    self._consumed_seq = self._latest.seq
+                    return self._latest
+                if self._error is not None:
+                    raise self._error
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._stop.is_set():
+                    return None
+                self._condition.wait(remaining)
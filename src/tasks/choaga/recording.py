@@ -0,0 +1,299 @@
+"""Session recording (ROI frames + inputs) and offline replay for the fishing task"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Registered regions (x1, y1, x2, y2) at the reference resolution they were measured at
+FISHING_REGIONS = {
+    "fish": ((1920, 1080), (1620, 325, 1645, 725)),
+    "bite": ((3840, 2160), (3147, 1566, 3383, 1797)),
+    "chance": ((3840, 2160), (3467, 1797, 3703, 2033)),
+}
+
+
+def scale_region(region, frame_shape) -> tuple:
+    """(x, y, w, h) in pixels of a registered ((ref_w, ref_h), (x1, y1, x2, y2)) region for a frame"""
+    (ref_width, ref_height), (x1, y1, x2, y2) = region
+    height, width = frame_shape[:2]
+    sx, sy = width / ref_width, height / ref_height
+    x, y = int(x1 * sx), int(y1 * sy)
+    return x, y, max(1, int(x2 * sx) - x), max(1, int(y2 * sy) - y)
+
+
+# Session file layout (little endian):
+#   MAGIC | record* | footer JSON | u64 footer offset | MAGIC
+# record = RECORD_HEADER (region id, kind, changed row count, time) + payload
+#   KEYFRAME: the raw crop
+#   DELTA:    u16 indices of the rows that differ from the previous crop, then those rows
+# The footer holds the frame shape, the regions (with crop shape and dtype), the
+# input log and a per-region index of (time, payload offset, kind, rows).
+SESSION_MAGIC = b"CHSESS01"
+SESSION_EXTENSION = ".chsess"
+RECORD_HEADER = struct.Struct("<BBIxxd")
+KEYFRAME, DELTA = 0, 1
+
+
+class SessionRecorder:
+    """Streams timestamped ROI crops and inputs to a session file
+
+    Only the registered regions are stored, and only the ones a caller asks
+    for (e.g. the fish strip during the fight). Each crop is written as the
+    rows that changed since the previous crop of the same region, with a full
+    keyframe every keyframe_interval crops so replay can seek. Records go to
+    disk as they arrive, only the index and inputs are kept until close().
+    The same frame is stored at most once per region; crops whose size
+    differs from the region's first crop (resolution change) are skipped.
+    add_frame(), add_input() and close() hold a lock, since the pipelined
+    fight loop adds frames from its worker while sending inputs.
+    """
+
+    def __init__(self, path: str, regions: dict = None, keyframe_interval: int = 120):
+        self.path = path
+        self.regions = dict(FISHING_REGIONS if regions is None else regions)
+        self.region_ids = {name: i for i, name in enumerate(self.regions)}
+        self.keyframe_interval = keyframe_interval
+        self.start = time.perf_counter()
+        self.frame_shape = None
+        self.inputs = []  # [(t, action, args)]
+        self.index = {name: [] for name in self.regions}  # name -> [(t, offset, kind, rows)]
+        self.shapes = {}
+        self.bytes_raw = 0
+        self._previous = {}
+        self._last_frame = {}
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(SESSION_MAGIC)
+
+    def now(self) -> float:
+        return time.perf_counter() - self.start
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.index.values())
+
+    def add_frame(self, frame: np.ndarray, names=None):
+        """Store the crops of the given registered regions (all by default) of a newly captured frame"""
+        if frame is None:
+            return
+        with self._lock:
+            if self._file is None:
+                return
+            t = self.now()
+            self.frame_shape = frame.shape
+            for name in names or self.regions:
+                if self._last_frame.get(name) is frame:
+                    continue
+                self._last_frame[name] = frame
+                x, y, w, h = scale_region(self.regions[name], frame.shape)
+                self._write_crop(name, t, frame[y:y + h, x:x + w])
+
+    def _write_crop(self, name: str, t: float, crop: np.ndarray):
+        shape = self.shapes.setdefault(name, (crop.shape, crop.dtype.str))[0]
+        if crop.shape != shape:
+            return
+        entries = self.index[name]
+        previous = self._previous.get(name)
+        self.bytes_raw += crop.nbytes
+        if previous is None or len(entries) % self.keyframe_interval == 0:
+            kind, rows, payload = KEYFRAME, 0, (np.ascontiguousarray(crop),)
+        else:
+            changed = (crop != previous).reshape(shape[0], -1).any(axis=1)
+            row_index = np.flatnonzero(changed).astype("<u2")
+            kind, rows, payload = DELTA, row_index.size, (row_index, np.ascontiguousarray(crop[row_index]))
+        self._file.write(RECORD_HEADER.pack(self.region_ids[name], kind, rows, t))
+        entries.append((t, self._file.tell(), kind, rows))
+        for part in payload:
+            self._file.write(part.tobytes())
+        self._previous[name] = crop.copy()
+
+    def add_input(self, action: str, *args):
+        """Record an input (e.g. "key_down", "space") with the current session time"""
+        with self._lock:
+            self.inputs.append((self.now(), action, list(args)))
+
+    def close(self) -> str:
+        """Write the footer (index, inputs) and close the file"""
+        with self._lock:
+            return self._close()
+
+    def _close(self) -> str:
+        if self._file is None:
+            return self.path
+        footer = {
+            "version": 1,
+            "frame_shape": list(self.frame_shape or ()),
+            "regions": {name: {"id": self.region_ids[name], "reference": self.regions[name][0],
+                               "box": self.regions[name][1], "shape": list(self.shapes[name][0]),
+                               "dtype": self.shapes[name][1]}
+                        for name in self.regions if name in self.shapes},
+            "inputs": self.inputs,
+            "index": {name: entries for name, entries in self.index.items() if entries},
+        }
+        offset = self._file.tell()
+        self._file.write(json.dumps(footer).encode("utf-8"))
+        self._file.write(struct.pack("<Q", offset))
+        self._file.write(SESSION_MAGIC)
+        self._file.close()
+        self._file = None
+        return self.path
+
+
+class Session:
+    """A session file opened through mmap; crops are decoded lazily from the mapped records
+
+    frame(name, i) rebuilds crop i from the nearest keyframe (or the last
+    decoded crop when replaying forward), reading rows straight out of the
+    mapping with np.frombuffer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._map
+        if data[:len(SESSION_MAGIC)] != SESSION_MAGIC or data[-len(SESSION_MAGIC):] != SESSION_MAGIC:
+            self.close()
+            raise ValueError(f"Not a session file: {path}")
+        footer_offset = struct.unpack_from("<Q", data, len(data) - len(SESSION_MAGIC) - 8)[0]
+        footer = json.loads(data[footer_offset:len(data) - len(SESSION_MAGIC) - 8].decode("utf-8"))
+        self.frame_shape = tuple(footer["frame_shape"])
+        self.regions = {name: (tuple(info["reference"]), tuple(info["box"])) for name, info in footer["regions"].items()}
+        self.shapes = {name: (tuple(info["shape"]), np.dtype(info["dtype"])) for name, info in footer["regions"].items()}
+        self.inputs = [(t, action, args) for t, action, args in footer["inputs"]]
+        self.index = {name: np.array(entries, dtype=np.float64).reshape(-1, 4)
+                      for name, entries in footer["index"].items()}
+        self.times = {name: entries[:, 0] for name, entries in self.index.items()}
+        self._decoded = {}
+
+    @classmethod
+    def load(cls, path: str) -> "Session":
+        return cls(path)
+
+    def close(self):
+        self._decoded.clear()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.index.values())
+
+    def timeline(self) -> list:
+        """[(t, region name, index)] of every stored crop in time order"""
+        events = [(float(t), name, i) for name, times in self.times.items() for i, t in enumerate(times)]
+        events.sort()
+        return events
+
+    def frame(self, name: str, i: int) -> np.ndarray:
+        """Crop i of a region (a buffer reused by the next call for that region)"""
+        entries = self.index[name]
+        cached = self._decoded.get(name)
+        if cached is not None and cached[0] == i:
+            return cached[1]
+        key = i
+        while int(entries[key, 2]) != KEYFRAME:
+            key -= 1
+        if cached is not None and key <= cached[0] < i:
+            current, buffer = cached[0] + 1, cached[1]
+        else:
+            buffer = self._read_keyframe(name, key)
+            current = key + 1
+        for j in range(current, i + 1):
+            self._apply_delta(name, j, buffer)
+        self._decoded[name] = (i, buffer)
+        return buffer
+
+    def _read_keyframe(self, name: str, i: int) -> np.ndarray:
+        shape, dtype = self.shapes[name]
+        offset = int(self.index[name][i, 1])
+        count = int(np.prod(shape))
+        return np.frombuffer(self._map, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+
+    def _apply_delta(self, name: str, i: int, buffer: np.ndarray):
+        _, offset, kind, rows = self.index[name][i]
+        offset, rows = int(offset), int(rows)
+        shape, dtype = self.shapes[name]
+        if int(kind) == KEYFRAME:
+            buffer[...] = np.frombuffer(self._map, dtype=dtype, count=buffer.size, offset=offset).reshape(shape)
+            return
+        if not rows:
+            return
+        row_index = np.frombuffer(self._map, dtype="<u2", count=rows, offset=offset)
+        row_size = buffer[0].size
+        values = np.frombuffer(self._map, dtype=dtype, count=rows * row_size, offset=offset + 2 * rows)
+        buffer[row_index] = values.reshape((rows,) + shape[1:])
+
+
+class ReplayFrame(NamedTuple):
+    time: float
+    region: str
+    roi: np.ndarray
+
+
+class ReplaySource:
+    """Feeds a recorded session back as frames, with the task-like frame / next_frame() / sleep() API
+
+    speed=1.0 replays in recorded time, 2.0 twice as fast, 0 as fast as
+    possible. `frame` is a full-size canvas (of the recorded frame shape)
+    with the latest crop of every region pasted at its position, so code
+    written against task.frame (e.g. FishBarDetector.detect_frame with the
+    fish ROI) runs on it unchanged. Raises StopIteration from next_frame()
+    when the session is exhausted.
+    """
+
+    def __init__(self, session: Session, speed: float = 1.0):
+        self.session = session
+        self.speed = speed
+        self.events = session.timeline()
+        self.position = 0
+        self.current = None
+        self.frame = np.zeros(session.frame_shape, dtype=np.uint8)
+        self._started = None
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.next_frame()
+            except StopIteration:
+                return
+
+    def region_box(self, name: str) -> tuple:
+        return scale_region(self.session.regions[name], self.frame.shape)
+
+    def next_frame(self) -> ReplayFrame:
+        """Advance to the next recorded crop, waiting for its timestamp unless speed is 0"""
+        if self.position >= len(self.events):
+            raise StopIteration
+        t, name, index = self.events[self.position]
+        self.position += 1
+        if self.speed > 0:
+            if self._started is None:
+                self._started = time.perf_counter() - t / self.speed
+            delay = self._started + t / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        roi = self.session.frame(name, index)
+        x, y, w, h = self.region_box(name)
+        self.frame[y:y + h, x:x + w] = roi
+        self.current = ReplayFrame(t, name, roi)
+        return self.current
+
+    def sleep(self, seconds: float):
+        if self.speed > 0:
+            time.sleep(seconds / self.speed)
+
+    def inputs_until(self, t: float) -> list:
+        """Recorded inputs with a timestamp up to t"""
+        return [event for event in self.session.inputs if event[0] <= t]
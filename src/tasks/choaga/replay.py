@@ -0,0 +1,188 @@
+"""Offline detector regression over recorded fishing sessions
+
+Replays session files (logs/sessions/*.chsess, written with "Record
+Sessions") as fast as possible and runs the fight detector on every fish
+strip crop and the fused HUD detector on every bite / chance crop, the way
+the task does on live frames:
+
+    python -m src.tasks.choaga.replay logs/sessions
+    python -m src.tasks.choaga.replay logs/sessions --save detections.json
+    python -m src.tasks.choaga.replay logs/sessions --detector projection --check detections.json
+
+--save writes every detection; --check compares against such a file and
+lists the frames whose bar / icon / HUD state changed (exit status 1 when
+any did), so a detector change can be verified on real recordings.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import NamedTuple
+
+from src.tasks.choaga.fight import DETECTOR_METHODS, FishBarDetector
+from src.tasks.choaga.hud import HUD_ANNOTATIONS, HudDetector
+from src.tasks.choaga.recording import SESSION_EXTENSION, ReplaySource, Session
+
+HUD_REGIONS = ("bite", "chance")
+# The task records the regions of one frame one after the other, microseconds apart
+FRAME_GROUP_GAP = 0.005
+
+
+class ReplayDetection(NamedTuple):
+    """Detector output for one recorded frame; fields not produced by the detector are None"""
+    time: float
+    kind: str  # "fish" (fight detector) or "hud" (fused HUD detector)
+    has_bar: bool = None
+    has_icon: bool = None
+    bar_rect: list = None
+    icon_rect: list = None
+    state: str = None
+    scores: dict = None
+
+    def key(self) -> tuple:
+        """What --check compares: presence and rects of bar / icon, HUD state"""
+        return self.has_bar, self.has_icon, self.bar_rect, self.icon_rect, self.state
+
+
+def replay_session(path: str, fish_detector: FishBarDetector, hud_detector: HudDetector = None) -> list:
+    """Detections of every recorded frame of a session, in time order
+
+    Consecutive crops of different regions stored within FRAME_GROUP_GAP
+    (the bite and chance slots of one frame) are pasted onto the replay
+    canvas first and detected once together.
+    """
+    detections = []
+    with Session.load(path) as session:
+        source = ReplaySource(session, speed=0)
+        events = source.events
+        pending = set()
+        for replay_frame in source:
+            pending.add(replay_frame.region)
+            if source.position < len(events):
+                next_time, next_region, _ = events[source.position]
+                if next_region not in pending and next_time - replay_frame.time <= FRAME_GROUP_GAP:
+                    continue
+            frame = source.frame
+            if "fish" in pending:
+                roi = source.region_box("fish")
+                (has_bar, _, bar_rect), (has_icon, _, icon_rect), _ = fish_detector.detect_frame(
+                    frame, roi, frame.shape[0] / 1080)
+                detections.append(ReplayDetection(replay_frame.time, "fish", bool(has_bar), bool(has_icon),
+                                                  list(bar_rect) if bar_rect else None,
+                                                  list(icon_rect) if icon_rect else None))
+            if hud_detector is not None and pending.intersection(HUD_REGIONS):
+                reading = hud_detector.detect(frame)
+                detections.append(ReplayDetection(replay_frame.time, "hud", state=reading.state.value,
+                                                  scores={icon: round(s, 3) for icon, s in reading.scores.items()}))
+            pending.clear()
+    return detections
+
+
+def session_paths(paths) -> list:
+    """Session files of the given files and folders (folders are searched for *.chsess)"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(SESSION_EXTENSION))
+        else:
+            found.append(path)
+    return found
+
+
+def summarize(detections: list) -> str:
+    fish = [d for d in detections if d.kind == "fish"]
+    hud = [d for d in detections if d.kind == "hud"]
+    parts = []
+    if fish:
+        bars, icons = sum(d.has_bar for d in fish), sum(d.has_icon for d in fish)
+        parts.append(f"fish {len(fish)} frames, bar {bars}, icon {icons}")
+    if hud:
+        states = {}
+        for d in hud:
+            states[d.state] = states.get(d.state, 0) + 1
+        parts.append(f"hud {len(hud)} frames ({', '.join(f'{k} {v}' for k, v in sorted(states.items()))})")
+    return "; ".join(parts) or "no frames"
+
+
+def compare(expected: dict, actual: dict) -> list:
+    """[(session, time, kind, expected key, actual key)] for every frame whose detection changed"""
+    changes = []
+    for name, detections in actual.items():
+        before = {(d.time, d.kind): d for d in expected.get(name, [])}
+        for d in detections:
+            old = before.get((d.time, d.kind))
+            if old is not None and old.key() != d.key():
+                changes.append((name, d.time, d.kind, old.key(), d.key()))
+    return changes
+
+
+def save_detections(path: str, results: dict, detector: str):
+    data = {"version": 1, "detector": detector,
+            "sessions": {name: [d._asdict() for d in detections] for name, detections in results.items()}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_detections(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {name: [ReplayDetection(**d) for d in detections] for name, detections in data["sessions"].items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fishing detectors over recorded sessions")
+    parser.add_argument("sessions", nargs="+", help=f"{SESSION_EXTENSION} files or folders containing them")
+    parser.add_argument("--detector", choices=DETECTOR_METHODS, default="contours", help="fight detector")
+    parser.add_argument("--hud-threshold", type=float, default=0.8, help="fused HUD detector threshold")
+    parser.add_argument("--no-hud", action="store_true", help="only run the fight detector")
+    parser.add_argument("--save", help="write the detections to this JSON file")
+    parser.add_argument("--check", help="compare with detections saved by --save, exit 1 on changes")
+    args = parser.parse_args(argv)
+
+    paths = session_paths(args.sessions)
+    if not paths:
+        parser.error("no session files found")
+    expected = None
+    if args.check:
+        try:
+            expected = load_detections(args.check)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            parser.error(f"cannot read {args.check}: {e}")
+    hud_detector = None
+    if not args.no_hud:
+        try:
+            hud_detector = HudDetector.from_annotations(HUD_ANNOTATIONS, threshold=args.hud_threshold)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"cannot load the HUD templates ({e}), run from the ok-dna folder or pass --no-hud")
+    fish_detector = FishBarDetector(args.detector)
+
+    results = {}
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            detections = replay_session(path, fish_detector, hud_detector)
+        except (OSError, ValueError) as e:
+            print(f"{path}: skipped ({e})")
+            continue
+        name = os.path.basename(path)
+        results[name] = detections
+        print(f"{name}: {summarize(detections)} in {time.perf_counter() - start:.2f}s")
+
+    if args.save:
+        save_detections(args.save, results, args.detector)
+        print(f"{args.save}: {sum(len(d) for d in results.values())} detections")
+    if expected is not None:
+        missing = sorted(set(results) - set(expected))
+        if missing:
+            print(f"not in {args.check}: {', '.join(missing)}")
+        changes = compare(expected, results)
+        for name, t, kind, old, new in changes:
+            print(f"{name} t={t:.3f} {kind}: {old} -> {new}")
+        print(f"{len(changes)} changed detections")
+        if changes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
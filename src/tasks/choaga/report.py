@@ -0,0 +1,242 @@
+"""Fishing analytics report over session ledgers (markdown or static HTML)
+
+Aggregates every round and navigation record of one or more ledgers:
+
+    python -m src.tasks.choaga.report
+    python -m src.tasks.choaga.report logs/fishing_ledger.jsonl --since 2026-10-01 -o report.md
+    python -m src.tasks.choaga.report old_ledger.jsonl logs/fishing_ledger.jsonl --html -o report.html
+
+Fish are rounds caught minus chance casts (a chance cast uses the previous
+fish as bait, the task does not count that round either). The time of a
+round is the time since the previous record of the same session, so it
+includes failed phases and the pauses between rounds.
+"""
+import argparse
+import html
+import time
+import warnings
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from src.tasks.choaga.ledger import (CAUGHT, END_FAILED, FIGHT_TIMEOUT, NAVIGATION, NO_MORE_FISH, ROUND,
+                                     START_TIMEOUT, read_ledger)
+
+DEFAULT_LEDGER = "logs/fishing_ledger.jsonl"
+PHASES = ("start", "fight", "end")
+OUTCOMES = (CAUGHT, START_TIMEOUT, FIGHT_TIMEOUT, END_FAILED, NO_MORE_FISH)
+
+
+class Columns(NamedTuple):
+    """Ledger records as columns: spot / session / outcome are indices into the names tuples"""
+    spots: tuple
+    spot: np.ndarray
+    session: np.ndarray
+    time: np.ndarray
+    kind: np.ndarray  # True for rounds, False for navigations
+    outcome: np.ndarray  # index into OUTCOMES, -1 for navigations
+    phases: np.ndarray  # (n, len(PHASES)) seconds, NaN when the phase did not finish
+    chance: np.ndarray
+    nav_duration: np.ndarray  # NaN for rounds
+    nav_ok: np.ndarray
+    elapsed: np.ndarray  # seconds since the previous record of the session (rounds)
+
+
+def to_columns(records: list) -> Columns:
+    records = sorted(records, key=lambda r: (r.get("session", ""), r.get("time", 0.0)))
+    n = len(records)
+    spots, spot = np.unique(np.array([r.get("spot", "") for r in records], dtype=str), return_inverse=True)
+    _, session = np.unique(np.array([r.get("session", "") for r in records], dtype=str), return_inverse=True)
+    times = np.fromiter((r.get("time", 0.0) for r in records), dtype=np.float64, count=n)
+    kind = np.fromiter((r.get("type") == ROUND for r in records), dtype=bool, count=n)
+    outcome_index = {name: i for i, name in enumerate(OUTCOMES)}
+    outcome = np.fromiter((outcome_index.get(r.get("outcome"), -1) for r in records), dtype=np.int64, count=n)
+    phases = np.array([[(r.get("phases") or {}).get(p, np.nan) for p in PHASES] for r in records],
+                      dtype=np.float64).reshape(n, len(PHASES))
+    chance = np.fromiter((bool(r.get("chance")) for r in records), dtype=bool, count=n)
+    nav_duration = np.fromiter((r.get("duration", np.nan) if r.get("type") == NAVIGATION else np.nan
+                                for r in records), dtype=np.float64, count=n)
+    nav_ok = np.fromiter((bool(r.get("ok")) for r in records), dtype=bool, count=n)
+
+    # Round time = gap to the previous record of the same session; the first record of a session falls back
+    # to the sum of its finished phases
+    elapsed = np.empty(n)
+    if n:
+        elapsed[0] = np.nan
+        elapsed[1:] = np.diff(times)
+        elapsed[1:][session[1:] != session[:-1]] = np.nan
+    fallback = np.nansum(phases, axis=1)
+    elapsed = np.where(np.isnan(elapsed), fallback, elapsed)
+    elapsed[~kind] = np.nan
+    return Columns(tuple(str(s) for s in spots), spot.astype(np.int64), session.astype(np.int64), times, kind,
+                   outcome, phases, chance, nav_duration, nav_ok, elapsed)
+
+
+def _per_spot(columns: Columns, mask: np.ndarray, weights=None) -> np.ndarray:
+    """Sum of weights (count when None) per spot over the masked records"""
+    values = mask.astype(np.float64) if weights is None else np.where(mask, weights, 0.0)
+    return np.bincount(columns.spot, weights=values, minlength=len(columns.spots))
+
+
+def _ratio(a, b) -> np.ndarray:
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return np.divide(a, b, out=np.full(np.broadcast(a, b).shape, np.nan), where=b > 0)
+
+
+class Table(NamedTuple):
+    title: str
+    header: tuple
+    rows: list
+    note: str = ""
+
+
+def _fmt(value, spec: str = ".1f") -> str:
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return "-"
+    return format(value, spec)
+
+
+def build_report(columns: Columns) -> list:
+    """Report tables: overview, per spot yield, outcomes, phase times, navigation"""
+    rounds = columns.kind
+    navigations = ~columns.kind
+    caught = rounds & (columns.outcome == OUTCOMES.index(CAUGHT))
+    chance = rounds & columns.chance
+    spot_rounds = _per_spot(columns, rounds)
+    spot_caught = _per_spot(columns, caught)
+    spot_chance = _per_spot(columns, chance)
+    spot_fish = spot_caught - spot_chance
+    spot_fishing = _per_spot(columns, rounds, np.nan_to_num(columns.elapsed))
+    spot_nav = _per_spot(columns, navigations, np.nan_to_num(columns.nav_duration))
+    spot_navs = _per_spot(columns, navigations)
+    names = columns.spots
+    tables = []
+
+    fishing, navigating = spot_fishing.sum(), spot_nav.sum()
+    start, end = (columns.time.min(), columns.time.max()) if len(columns.time) else (np.nan, np.nan)
+    span = " - ".join(datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M") for t in (start, end)) \
+        if np.isfinite(start) else "-"
+    tables.append(Table("Overview", ("", ""), [
+        ("Period", span),
+        ("Sessions", str(len(np.unique(columns.session)))),
+        ("Rounds", str(int(spot_rounds.sum()))),
+        ("Fish", str(int(spot_fish.sum()))),
+        ("Fishing time (h)", _fmt(fishing / 3600, ".2f")),
+        ("Navigation time (h)", _fmt(navigating / 3600, ".2f")),
+        ("Fish per hour (incl. navigation)", _fmt(float(_ratio(spot_fish.sum(), (fishing + navigating) / 3600)))),
+    ]))
+
+    per_hour = _ratio(spot_fish, spot_fishing / 3600)
+    per_hour_total = _ratio(spot_fish, (spot_fishing + spot_nav) / 3600)
+    tables.append(Table("Yield per spot", ("Spot", "Rounds", "Fish", "Fishing h", "Fish/h", "Fish/h incl. nav",
+                                           "Chance casts", "Chance %"), [
+        (names[i], str(int(spot_rounds[i])), str(int(spot_fish[i])), _fmt(spot_fishing[i] / 3600, ".2f"),
+         _fmt(per_hour[i]), _fmt(per_hour_total[i]), str(int(spot_chance[i])),
+         _fmt(100 * _ratio(spot_chance[i], spot_rounds[i])))
+        for i in range(len(names)) if spot_rounds[i] or spot_navs[i]
+    ], "Fish = rounds caught - chance casts (the chance cast uses the previous fish as bait)."))
+
+    counts = np.stack([_per_spot(columns, rounds & (columns.outcome == k)) for k in range(len(OUTCOMES))], axis=1)
+    failures = counts[:, 1:4].sum(axis=1)
+    tables.append(Table("Outcomes and failure rates", ("Spot",) + OUTCOMES + ("Failure %",), [
+        (names[i],) + tuple(str(int(c)) for c in counts[i]) + (_fmt(100 * _ratio(failures[i], spot_rounds[i])),)
+        for i in range(len(names)) if spot_rounds[i]
+    ], "Failure = start timeout, fight timeout or end confirmation failed."))
+
+    rows = []
+    for i in range(len(names)):
+        phases = columns.phases[rounds & (columns.spot == i)]
+        if not len(phases):
+            continue
+        finished = np.isfinite(phases)
+        with warnings.catch_warnings():
+            # All-NaN columns (a phase that never finished) give NaN, shown as "-"
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(phases, axis=0)
+            p50, p95 = np.nanquantile(phases, [0.5, 0.95], axis=0)
+        share = _ratio(np.nansum(phases, axis=0), np.nansum(phases))
+        for k, phase in enumerate(PHASES):
+            rows.append((names[i], phase, str(int(finished[:, k].sum())), _fmt(mean[k]), _fmt(p50[k]), _fmt(p95[k]),
+                         _fmt(100 * share[k])))
+    tables.append(Table("Phase times (s)", ("Spot", "Phase", "Finished", "Mean", "Median", "p95", "Share %"), rows,
+                        "Finished phases only."))
+
+    nav_ok = _per_spot(columns, navigations & columns.nav_ok)
+    tables.append(Table("Navigation vs fishing", ("Spot", "Navigations", "OK %", "Mean nav s", "Nav h", "Fishing h",
+                                                  "Nav share %"), [
+        (names[i], str(int(spot_navs[i])), _fmt(100 * _ratio(nav_ok[i], spot_navs[i])),
+         _fmt(_ratio(spot_nav[i], spot_navs[i])), _fmt(spot_nav[i] / 3600, ".2f"), _fmt(spot_fishing[i] / 3600, ".2f"),
+         _fmt(100 * _ratio(spot_nav[i], spot_nav[i] + spot_fishing[i])))
+        for i in range(len(names)) if spot_navs[i] or spot_rounds[i]
+    ]))
+    return tables
+
+
+def render_markdown(tables: list, title: str) -> str:
+    lines = [f"# {title}", ""]
+    for table in tables:
+        lines += [f"## {table.title}", ""]
+        lines.append("| " + " | ".join(table.header) + " |")
+        lines.append("|" + "|".join("---" for _ in table.header) + "|")
+        lines += ["| " + " | ".join(row) + " |" for row in table.rows]
+        if table.note:
+            lines += ["", f"_{table.note}_"]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def render_html(tables: list, title: str) -> str:
+    parts = [f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>",
+             "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:.5em}"
+             "th,td{border:1px solid #ccc;padding:4px 8px;text-align:right}th:first-child,td:first-child"
+             "{text-align:left}p.note{color:#666;font-size:90%}</style></head><body>",
+             f"<h1>{html.escape(title)}</h1>"]
+    for table in tables:
+        parts.append(f"<h2>{html.escape(table.title)}</h2><table><tr>"
+                     + "".join(f"<th>{html.escape(h)}</th>" for h in table.header) + "</tr>")
+        for row in table.rows:
+            parts.append("<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>")
+        parts.append("</table>")
+        if table.note:
+            parts.append(f"<p class=\"note\">{html.escape(table.note)}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def load_records(paths, since: float = None) -> list:
+    records = []
+    for path in paths:
+        records += read_ledger(path)
+    if since is not None:
+        records = [r for r in records if r.get("time", 0.0) >= since]
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fishing analytics report over session ledgers")
+    parser.add_argument("ledgers", nargs="*", default=[DEFAULT_LEDGER], help=f"ledger files (default {DEFAULT_LEDGER})")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of printing it")
+    parser.add_argument("--html", action="store_true", help="static HTML instead of markdown")
+    parser.add_argument("--since", help="only records from this date on (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+    since = datetime.strptime(args.since, "%Y-%m-%d").timestamp() if args.since else None
+
+    start = time.perf_counter()
+    try:
+        records = load_records(args.ledgers, since)
+    except OSError as e:
+        parser.error(f"cannot read ledger: {e}")
+    tables = build_report(to_columns(records))
+    title = f"Fishing report ({len(records)} records)"
+    text = render_html(tables, title) if args.html else render_markdown(tables, title)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{args.output}: {len(records)} records in {time.perf_counter() - start:.2f}s")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
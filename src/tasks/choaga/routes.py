@@ -0,0 +1,141 @@
+"""Route timing compression: shorten the recorded sleeps of a spot route, verified by an arrival checkpoint"""
+import json
+import logging
+import os
+
+from src.tasks.choaga.navigation import Sleep
+
+logger = logging.getLogger(__name__)
+
+ROUTE_EXTENSION = ".route.json"
+
+
+def action_to_dict(action) -> dict:
+    return {"type": type(action).__name__, **action._asdict()}
+
+
+class RouteOptimizer:
+    """Finds the shortest sleep every segment of a route needs, one probe per run
+
+    A segment is one Sleep of the route. Each run uses the shortest timings
+    verified so far ("good", the recorded ones to start with) except for one
+    probed segment, tried halfway between its good value and the longest
+    value known to fail ("floor"). report() keeps the probe when the arrival
+    checkpoint (e.g. fish.png) was seen after the route, and makes it the new
+    floor otherwise. A segment is settled once good - floor <= resolution;
+    the segment with the most time left to gain is probed first.
+
+    A failed run without a probe means the verified timings no longer hold
+    (lag, game update), so all segments fall back to the recorded timings.
+    State and the compressed route are written to path after every report
+    and only reused while the script content (digest) is unchanged.
+    """
+
+    def __init__(self, script, path: str, resolution: float = 0.1, min_sleep: float = 0.05):
+        self.script = script
+        self.path = path
+        self.resolution = resolution
+        self.min_sleep = min_sleep
+        self.sleeps = [i for i, action in enumerate(script.actions) if isinstance(action, Sleep)]
+        self.recorded = [script.actions[i].seconds for i in self.sleeps]
+        self.good = list(self.recorded)
+        self.floor = [0.0] * len(self.sleeps)
+        self.runs = 0
+        self.failures = 0
+        self.probe = None  # (segment, seconds) of the current run
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        segments = state.get("segments", [])
+        if state.get("digest") != self.script.digest or [s["index"] for s in segments] != self.sleeps:
+            logger.info(f"route timings in {self.path} are for another version of {self.script.path}, starting over")
+            return
+        self.good = [min(s["good"], s["recorded"]) for s in segments]
+        self.floor = [s["floor"] for s in segments]
+        self.runs = state.get("runs", 0)
+        self.failures = state.get("failures", 0)
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        state = {
+            "version": 1,
+            "script": self.script.path,
+            "digest": self.script.digest,
+            "runs": self.runs,
+            "failures": self.failures,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "segments": [{"index": i, "recorded": r, "good": g, "floor": f}
+                         for i, r, g, f in zip(self.sleeps, self.recorded, self.good, self.floor)],
+            "route": [action_to_dict(action) for action in self.compressed_route()],
+        }
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(temp, self.path)
+
+    @property
+    def saved_seconds(self) -> float:
+        return sum(self.recorded) - sum(self.good)
+
+    def _gain(self, k: int) -> float:
+        """Time a probe of segment k could still save (<= resolution: settled)"""
+        return self.good[k] - max(self.floor[k], self.min_sleep)
+
+    @property
+    def settled(self) -> bool:
+        return all(self._gain(k) <= self.resolution for k in range(len(self.sleeps)))
+
+    def _route(self, timings) -> list:
+        actions = list(self.script.actions)
+        for i, seconds in zip(self.sleeps, timings):
+            actions[i] = Sleep(seconds)
+        return actions
+
+    def compressed_route(self) -> list:
+        """The route with the verified timings"""
+        return self._route(self.good)
+
+    def recorded_route(self) -> list:
+        return list(self.script.actions)
+
+    def next_route(self) -> list:
+        """Route for the next run: verified timings, plus one probed segment until all are settled"""
+        self.probe = None
+        candidates = [k for k in range(len(self.sleeps)) if self._gain(k) > self.resolution]
+        timings = list(self.good)
+        if candidates:
+            k = max(candidates, key=self._gain)
+            seconds = max(self.min_sleep, (max(self.floor[k], 0.0) + self.good[k]) / 2)
+            self.probe = (k, seconds)
+            timings[k] = seconds
+        return self._route(timings)
+
+    def report(self, arrived: bool):
+        """Result of the run started by next_route(): was the arrival checkpoint reached?"""
+        self.runs += 1
+        if self.probe is not None:
+            k, seconds = self.probe
+            if arrived:
+                self.good[k] = seconds
+            else:
+                self.floor[k] = seconds
+            logger.debug(f"route segment {k} at {seconds:.2f}s {'arrived' if arrived else 'missed'}")
+        elif not arrived:
+            self.failures += 1
+            self.good = list(self.recorded)
+            logger.warning(f"verified route timings of {self.script.path} missed the checkpoint, "
+                           f"falling back to the recorded timings")
+        self.probe = None
+        self.save()
+
+    def summary(self) -> str:
+        done = sum(1 for k in range(len(self.sleeps)) if self._gain(k) <= self.resolution)
+        return (f"{sum(self.good):.2f}s of {sum(self.recorded):.2f}s recorded sleep "
+                f"({done}/{len(self.sleeps)} segments settled, {self.runs} runs, {self.failures} fallbacks)")
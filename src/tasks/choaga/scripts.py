@@ -0,0 +1,158 @@
+"""Spot navigation scripts: recorded pyautogui routes parsed into navigation actions, with a cache"""
+import ast
+import hashlib
+import logging
+import os
+import threading
+from typing import NamedTuple
+
+from src.tasks.choaga.navigation import Click, MouseDown, MouseUp, Press, Sleep, prepare_route
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_MODULES = ("pyautogui", "time")
+
+
+class ScriptError(Exception):
+    """A spot script that cannot be turned into navigation actions"""
+
+
+def _literal(node, path: str):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise ScriptError(f"{path}:{node.lineno}: only literal arguments are supported") from None
+
+
+def _call_actions(call: ast.Call, path: str) -> list:
+    """Navigation actions for one pyautogui / time call"""
+    func = call.func
+    if not (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+            and func.value.id in SCRIPT_MODULES):
+        raise ScriptError(f"{path}:{call.lineno}: unsupported call {ast.unparse(func)}")
+    name = f"{func.value.id}.{func.attr}"
+    args = [_literal(arg, path) for arg in call.args]
+    kwargs = {keyword.arg: _literal(keyword.value, path) for keyword in call.keywords}
+    try:
+        if name in ("time.sleep", "pyautogui.sleep"):
+            return [Sleep(float(args[0] if args else kwargs["seconds"]))]
+        if name == "pyautogui.moveTo":
+            # The task clicks at the recorded coordinates directly
+            return []
+        if name == "pyautogui.press":
+            key = args[0] if args else kwargs["keys"]
+            presses = int(kwargs.get("presses", args[1] if len(args) > 1 else 1))
+            interval = float(kwargs.get("interval", args[2] if len(args) > 2 else 0.0))
+            actions = []
+            for i in range(presses):
+                if i and interval > 0:
+                    actions.append(Sleep(interval))
+                actions.append(Press(str(key)))
+            return actions
+        if name == "pyautogui.click":
+            return [Click(int(args[0] if args else kwargs["x"]), int(args[1] if len(args) > 1 else kwargs["y"]))]
+        if name == "pyautogui.mouseDown":
+            return [MouseDown(int(args[0] if args else kwargs["x"]), int(args[1] if len(args) > 1 else kwargs["y"]))]
+        if name == "pyautogui.mouseUp":
+            return [MouseUp()]
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        raise ScriptError(f"{path}:{call.lineno}: bad arguments for {name}: {e!r}") from None
+    raise ScriptError(f"{path}:{call.lineno}: unsupported call {name}")
+
+
+def _parse_body(body: list, path: str) -> list:
+    actions = []
+    for node in body:
+        if isinstance(node, ast.Import) and all(alias.name in SCRIPT_MODULES for alias in node.names):
+            continue
+        if isinstance(node, ast.ImportFrom) and node.module in SCRIPT_MODULES:
+            continue
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # docstring / comment string
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            actions.extend(_call_actions(node.value, path))
+            continue
+        if (isinstance(node, ast.For) and not node.orelse and isinstance(node.iter, ast.Call)
+                and isinstance(node.iter.func, ast.Name) and node.iter.func.id == "range"
+                and len(node.iter.args) == 1 and not node.iter.keywords):
+            # for _ in range(n): repeated steps, unrolled
+            actions.extend(_parse_body(node.body, path) * int(_literal(node.iter.args[0], path)))
+            continue
+        raise ScriptError(f"{path}:{node.lineno}: unsupported statement {type(node).__name__}")
+    return actions
+
+
+def parse_spot_script(source: str, path: str = "<spot script>") -> list:
+    """Recorded route (straight-line pyautogui / time calls, range loops) -> navigation actions
+
+    Raises ScriptError for anything else, so a bad script fails when it is
+    loaded instead of halfway through a route.
+    """
+    try:
+        tree = ast.parse(source, path)
+    except SyntaxError as e:
+        raise ScriptError(f"{path}: {e}") from e
+    return _parse_body(tree.body, path)
+
+
+class SpotScript(NamedTuple):
+    """A parsed spot script, keyed by the hash of the file content"""
+    path: str
+    digest: str
+    recorded: tuple  # every action of the recording
+    actions: tuple  # the route run after teleporting (see prepare_route)
+    skipped_to_first_w: bool
+
+
+def load_spot_script(source: str, path: str = "<spot script>", digest: str = None) -> SpotScript:
+    if digest is None:
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    recorded = parse_spot_script(source, path)
+    actions, skipped = prepare_route(recorded)
+    return SpotScript(path, digest, tuple(recorded), tuple(actions), skipped)
+
+
+class SpotScriptCache:
+    """Parsed spot scripts, keyed by file content hash and revalidated when the file changes
+
+    get() only stats the file when its size and mtime are unchanged; otherwise
+    the file is read and hashed, and parsed again only if the content differs.
+    """
+
+    def __init__(self):
+        self._by_digest = {}
+        self._by_path = {}  # path -> (size, mtime_ns, digest)
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, path: str) -> SpotScript:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            known = self._by_path.get(key)
+            if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+                return self._by_digest[known[2]]
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            script = self._by_digest.get(digest)
+            if script is None:
+                script = load_spot_script(data.decode("utf-8-sig"), path, digest)
+                self._by_digest[digest] = script
+                self.loads += 1
+                logger.debug(f"parsed spot script {path} ({digest[:10]}, {len(script.actions)} actions)")
+            self._by_path[key] = (stat.st_size, stat.st_mtime_ns, digest)
+            return script
+
+    def clear(self):
+        with self._lock:
+            self._by_digest.clear()
+            self._by_path.clear()
+
+
+_script_cache = SpotScriptCache()
+
+
+def get_script_cache() -> SpotScriptCache:
+    """Process-wide spot script cache"""
+    return _script_cache
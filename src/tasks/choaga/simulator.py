@@ -0,0 +1,236 @@
+"""Offline simulator of the fishing fight mini-game and controller benchmark
+
+Renders synthetic fish ROI strips (bar, fish icon, background noise) the way
+the game shows them, runs them through FishBarDetector and a FightController,
+and applies the hold/release decisions to a simple bar physics model after a
+configurable input latency. Used to compare controllers and their parameters
+without the game:
+
+    python -m src.tasks.choaga.simulator --games 50
+    python -m src.tasks.choaga.simulator --controller bang-bang --controller predictive:latency=0.08
+    python -m src.tasks.choaga.simulator --icon-outline 0 --latency 0.08
+
+By default the icon has a dark outline, so the detectors still see it
+while it is inside the bar. With --icon-outline 0 the icon merges into the
+bar there (has_icon is False), every controller falls back to the same
+merge rule and the controllers give identical results.
+"""
+import argparse
+import time
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+from src.tasks.choaga.fight import DETECTOR_METHODS, FightObservation, FishBarDetector, create_controller
+
+
+class FishingPhysics(NamedTuple):
+    """Mini-game parameters, lengths in ROI pixels at 1080p (25 x 400 strip)"""
+    track_height: int = 400
+    track_width: int = 25
+    bar_height: int = 100
+    bar_margin: int = 2
+    icon_size: int = 12
+    icon_outline: int = 1  # dark ring around the icon, keeps it visible inside the bar; 0 = merges into the bar
+    hold_accel: float = 1000.0  # upwards while space is held (px/s^2)
+    gravity: float = 900.0  # downwards while released (px/s^2)
+    max_speed: float = 350.0
+    bounce: float = 0.3  # fraction of speed kept when the bar hits an end of the track
+    icon_speed: float = 150.0  # max fish icon speed (px/s)
+    icon_dart_interval: tuple = (0.4, 1.5)  # seconds between fish target changes
+    progress_gain: float = 0.25  # catch progress per second while the icon is inside the bar
+    progress_drain: float = 0.12  # progress lost per second while outside
+    start_progress: float = 0.3
+    timeout: float = 60.0
+
+
+class FishingGame:
+    """State of one simulated fight; step() advances it by dt with space held or not"""
+
+    def __init__(self, physics: FishingPhysics = FishingPhysics(), seed: int = None):
+        self.physics = physics
+        self.rng = np.random.default_rng(seed)
+        p = physics
+        self.bar_y = float(p.track_height - p.bar_height)  # bar top, starts at the bottom
+        self.bar_v = 0.0
+        self.icon_y = float(self.rng.uniform(0, p.track_height - p.icon_size))
+        self.icon_target = self.icon_y
+        self.next_dart = 0.0
+        self.progress = p.start_progress
+        self.time = 0.0
+        self.background = None
+
+    @property
+    def finished(self) -> bool:
+        return self.progress >= 1.0 or self.progress <= 0.0 or self.time >= self.physics.timeout
+
+    @property
+    def caught(self) -> bool:
+        return self.progress >= 1.0
+
+    def icon_in_bar(self) -> bool:
+        center = self.icon_y + self.physics.icon_size / 2
+        return self.bar_y <= center <= self.bar_y + self.physics.bar_height
+
+    def step(self, dt: float, hold: bool):
+        p = self.physics
+        self.time += dt
+
+        # Bar: accelerates up while holding, falls otherwise, bounces at both ends
+        accel = -p.hold_accel if hold else p.gravity
+        self.bar_v = float(np.clip(self.bar_v + accel * dt, -p.max_speed, p.max_speed))
+        self.bar_y += self.bar_v * dt
+        lowest = p.track_height - p.bar_height
+        if self.bar_y < 0 or self.bar_y > lowest:
+            self.bar_y = float(np.clip(self.bar_y, 0, lowest))
+            self.bar_v = -self.bar_v * p.bounce
+
+        # Fish icon: darts towards random targets at random intervals
+        if self.time >= self.next_dart:
+            self.icon_target = float(self.rng.uniform(0, p.track_height - p.icon_size))
+            self.next_dart = self.time + float(self.rng.uniform(*p.icon_dart_interval))
+        delta = self.icon_target - self.icon_y
+        self.icon_y += float(np.clip(delta, -p.icon_speed * dt, p.icon_speed * dt))
+
+        if self.icon_in_bar():
+            self.progress += p.progress_gain * dt
+        else:
+            self.progress -= p.progress_drain * dt
+
+    def render(self, scale: float = 1.0) -> np.ndarray:
+        """Grayscale ROI strip: dim noisy background, bright bar (230) and icon (255)
+
+        The icon gets a dark ring of physics.icon_outline pixels. Without it
+        (0) an icon inside the bar touches the bar, so the detectors see a
+        single blob, which is the in-game merge case.
+        """
+        p = self.physics
+        height, width = int(p.track_height * scale), int(p.track_width * scale)
+        if self.background is None or self.background.shape != (height, width):
+            self.background = self.rng.integers(0, 150, (height, width), dtype=np.uint8)
+        roi = self.background.copy()
+        margin = int(p.bar_margin * scale)
+        top = int(self.bar_y * scale)
+        roi[top:top + int(p.bar_height * scale), margin:width - margin] = 230
+        size = int(p.icon_size * scale)
+        icon_top = int(self.icon_y * scale)
+        icon_left = (width - size) // 2
+        ring = int(p.icon_outline * scale)
+        if ring:
+            roi[max(0, icon_top - ring):icon_top + size + ring, max(0, icon_left - ring):icon_left + size + ring] = 0
+        roi[icon_top:icon_top + size, icon_left:icon_left + size] = 255
+        return roi
+
+
+class GameResult(NamedTuple):
+    caught: bool
+    duration: float
+    decisions: int
+    decide_time: float  # wall-clock seconds spent in detection + decision
+
+
+def play(controller, detector: FishBarDetector, physics: FishingPhysics = FishingPhysics(), seed: int = None,
+         fps: float = 60.0, latency: float = 0.05, scale: float = 1.0) -> GameResult:
+    """Simulate one fight, the controller's decisions reach the game `latency` seconds later"""
+    game = FishingGame(physics, seed)
+    controller.reset()
+    dt = 1.0 / fps
+    pending = deque()  # (apply_at, hold)
+    hold = held = False
+    control_zone_ratio = 0.25
+    roi_area = physics.track_height * physics.track_width * scale ** 2
+    decisions = 0
+    decide_time = 0.0
+    while not game.finished:
+        roi = game.render(scale)
+        start = time.perf_counter()
+        bar, icon, bar_area = detector.detect(roi, scale)
+        if bar[0]:
+            # Same adaptive control zone rule as find_bar_and_fish_by_area
+            zone_ratio = bar_area / roi_area
+            if abs(zone_ratio - control_zone_ratio) / control_zone_ratio > 0.1:
+                control_zone_ratio = zone_ratio
+        decision = controller.decide(FightObservation(game.time, bar[0], bar[1], bar[2], icon[0], icon[1],
+                                                      control_zone_ratio))
+        decide_time += time.perf_counter() - start
+        decisions += 1
+        if decision is not None and decision != hold:
+            hold = decision
+            pending.append((game.time + latency, hold))
+        while pending and pending[0][0] <= game.time:
+            held = pending.popleft()[1]
+        game.step(dt, held)
+    return GameResult(game.caught, game.time, decisions, decide_time)
+
+
+class BenchmarkRow(NamedTuple):
+    label: str
+    success_rate: float
+    mean_time_to_catch: float
+    decisions_per_second: float
+
+
+def parse_controller(spec: str) -> tuple:
+    """"predictive:latency=0.08,window=6" -> ("predictive", {"latency": 0.08, "window": 6})"""
+    name, _, params = spec.partition(":")
+    kwargs = {}
+    for item in filter(None, params.split(",")):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        kwargs[key] = int(value) if key == "window" else float(value)
+    return name.strip(), kwargs
+
+
+def benchmark(controller_specs, games: int = 30, seed: int = 0, fps: float = 60.0, latency: float = 0.05,
+              detector: str = "contours", scale: float = 1.0, physics: FishingPhysics = FishingPhysics()) -> list:
+    """Play the same seeded games with every controller spec and summarize each"""
+    rows = []
+    fish_detector = FishBarDetector(detector)
+    for spec in controller_specs:
+        name, params = parse_controller(spec)
+        controller = create_controller(name, **params)
+        results = [play(controller, fish_detector, physics, seed + i, fps, latency, scale) for i in range(games)]
+        caught = [r.duration for r in results if r.caught]
+        decide_time = sum(r.decide_time for r in results)
+        rows.append(BenchmarkRow(
+            spec,
+            len(caught) / games,
+            float(np.mean(caught)) if caught else float("nan"),
+            sum(r.decisions for r in results) / decide_time if decide_time > 0 else float("nan"),
+        ))
+    return rows
+
+
+def format_rows(rows: list) -> str:
+    lines = [f"{'controller':<40} {'success':>8} {'catch s':>8} {'decisions/s':>12}"]
+    for row in rows:
+        lines.append(f"{row.label:<40} {row.success_rate:>8.0%} {row.mean_time_to_catch:>8.2f} "
+                     f"{row.decisions_per_second:>12.0f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fight controllers on the simulated fishing mini-game")
+    parser.add_argument("--controller", action="append", dest="controllers",
+                        help='name[:key=value,...], e.g. "predictive:latency=0.08" (repeatable)')
+    parser.add_argument("--games", type=int, default=30, help="games per controller")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=60.0, help="frames (decisions) per simulated second")
+    parser.add_argument("--latency", type=float, default=0.05, help="capture-to-input latency in seconds")
+    parser.add_argument("--detector", choices=DETECTOR_METHODS, default="contours")
+    parser.add_argument("--scale", type=float, default=1.0, help="resolution relative to 1080p")
+    parser.add_argument("--icon-outline", type=int, default=FishingPhysics().icon_outline,
+                        help="dark ring (px) around the icon so it stays visible inside the bar; 0 merges it into "
+                             "the bar, which makes all controllers behave the same")
+    args = parser.parse_args(argv)
+    specs = args.controllers or ["bang-bang", "predictive:latency=0.03", "predictive:latency=0.06",
+                                 "predictive:latency=0.1"]
+    physics = FishingPhysics(icon_outline=args.icon_outline)
+    rows = benchmark(specs, args.games, args.seed, args.fps, args.latency, args.detector, args.scale, physics)
+    print(f"{args.games} games, {args.fps:g} fps, {args.latency * 1000:g} ms latency, {args.detector} detector")
+    print(format_rows(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Fixed-size latency recording for the fishing fight loop"""
+import os
+
+import numpy as np
+
+FIGHT_LATENCY_FIELDS = ("frame_age", "detect", "input", "loop")
+
+
+class LatencyRecorder:
+    """Ring buffer of per-iteration timings (seconds), one column per field
+
+    record() only writes into a preallocated array, so it is safe to call on
+    every iteration of a hot loop. Missing values (e.g. no key was sent in an
+    iteration) are stored as NaN and ignored by the percentiles.
+    """
+
+    def __init__(self, fields=FIGHT_LATENCY_FIELDS, capacity: int = 4096):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.samples = np.full((capacity, len(self.fields)), np.nan)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def record(self, *values: float):
+        """Store one iteration, values in the order of self.fields"""
+        self.samples[self.count % self.capacity] = values
+        self.count += 1
+
+    def clear(self):
+        self.samples.fill(np.nan)
+        self.count = 0
+
+    def ordered(self) -> np.ndarray:
+        """Recorded rows, oldest first"""
+        if self.count <= self.capacity:
+            return self.samples[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self.samples[start:], self.samples[:start]))
+
+    def percentiles(self, quantiles=(50, 95, 99)) -> dict:
+        """{field: array of percentiles (seconds)}, NaN where a field has no samples"""
+        rows = self.samples[:len(self)]
+        result = {}
+        for i, field in enumerate(self.fields):
+            column = rows[:, i]
+            column = column[~np.isnan(column)]
+            if column.size:
+                result[field] = np.percentile(column, quantiles)
+            else:
+                result[field] = np.full(len(quantiles), np.nan)
+        return result
+
+    def summary(self) -> dict:
+        """{field: "p50 / p95 / p99" in milliseconds} for display, plus the loop rate in Hz"""
+        stats = self.percentiles((50, 95, 99))
+        text = {field: " / ".join(f"{value * 1000:.1f}" for value in values) for field, values in stats.items()}
+        if "loop" in stats and stats["loop"][0] > 0:
+            text["rate"] = f"{1 / stats['loop'][0]:.1f}"
+        return text
+
+    def dump(self, path: str) -> str:
+        """Write the buffer (oldest first, milliseconds) and its percentiles to a CSV file"""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        stats = self.percentiles((50, 95, 99))
+        with open(path, "w", encoding="utf-8") as f:
+            for name, column in zip(("p50", "p95", "p99"), range(3)):
+                values = ",".join(f"{stats[field][column] * 1000:.3f}" for field in self.fields)
+                f.write(f"# {name},{values}\n")
+            f.write(",".join(f"{field}_ms" for field in self.fields) + "\n")
+            np.savetxt(f, self.ordered() * 1000, fmt="%.3f", delimiter=",")
+        return path
@@ -0,0 +1,87 @@
+"""Adaptive phase timeouts learned from recent phase durations (and timeouts), per fishing spot"""
+import json
+import logging
+import os
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimeouts:
+    """Rolling per-spot phase durations and the timeouts derived from them
+
+    record() keeps the last `window` durations per (spot, phase). A phase
+    that ran into its timeout is recorded as censored at the timeout (it
+    took at least that long). timeout() returns the `quantile` of the
+    durations plus a margin (at least `margin` seconds or `margin_ratio` of
+    the quantile), never more than the configured cap and never less than
+    `minimum`. The cap is used as is until min_samples durations are known.
+    Censored durations count as the cap (a lower bound of how long the phase
+    would have needed): the rounds a learned timeout cuts short are exactly
+    the long ones it never sees, so without them it could only ever shrink.
+    One timeout only moves the tail of the window; once more than
+    1 - quantile of it timed out, the quantile is the cap itself.
+    """
+
+    def __init__(self, window: int = 50, quantile: float = 0.95, margin: float = 2.0, margin_ratio: float = 0.5,
+                 min_samples: int = 10, minimum: float = 3.0):
+        self.window = window
+        self.quantile = quantile
+        self.margin = margin
+        self.margin_ratio = margin_ratio
+        self.min_samples = min_samples
+        self.minimum = minimum
+        self.durations = {}  # (spot, phase) -> deque of (seconds, censored)
+
+    def record(self, spot: str, phase: str, seconds: float, censored: bool = False):
+        """Add a phase duration; censored=True for a phase stopped by its timeout after seconds"""
+        history = self.durations.get((spot, phase))
+        if history is None:
+            history = self.durations[(spot, phase)] = deque(maxlen=self.window)
+        history.append((float(seconds), bool(censored)))
+
+    def learned(self, spot: str, phase: str, cap: float):
+        """Quantile + margin of the recorded durations (censored ones at the cap), None before min_samples"""
+        history = self.durations.get((spot, phase))
+        if history is None or len(history) < self.min_samples:
+            return None
+        seconds = np.fromiter((max(seconds, cap) if censored else seconds for seconds, censored in history),
+                              dtype=np.float64, count=len(history))
+        q = float(np.quantile(seconds, self.quantile))
+        return max(self.minimum, q + max(self.margin, self.margin_ratio * q))
+
+    def timeout(self, spot: str, phase: str, cap: float) -> float:
+        learned = self.learned(spot, phase, cap)
+        return cap if learned is None else min(cap, learned)
+
+    def save(self, path: str):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        data = {"version": 2, "durations": [{"spot": spot, "phase": phase,
+                                             "seconds": [round(seconds, 3) for seconds, _ in history],
+                                             "censored": [int(censored) for _, censored in history]}
+                                            for (spot, phase), history in self.durations.items()]}
+        temp = path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "PhaseTimeouts":
+        """Timeouts with the durations saved at path (empty when the file is missing or unreadable)"""
+        timeouts = cls(**kwargs)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data.get("durations", []):
+                censored = item.get("censored") or [0] * len(item["seconds"])  # version 1: successes only
+                for seconds, cut in list(zip(item["seconds"], censored))[-timeouts.window:]:
+                    timeouts.record(item["spot"], item["phase"], seconds, cut)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Cannot read phase durations from {path}: {e}")
+        return timeouts
@@ -0,0 +1,70 @@
+"""Deadline-based waits on time.perf_counter for input sequences (routes, skill combos)"""
+import time
+from typing import Callable
+
+
+class TimerCancelled(Exception):
+    """The cancel() check of a DeadlineTimer returned True during a wait"""
+
+
+class DeadlineTimer:
+    """Waits scheduled against absolute perf_counter deadlines, so they do not drift
+
+    wait(seconds) advances the timer's deadline by seconds and sleeps until
+    it: time spent between waits (sending an input, scheduler overshoot of
+    the previous wait) is absorbed by the next one instead of adding up.
+    reset() re-anchors the deadline at the current time, e.g. to measure a
+    wait from the end of an input that takes its own time. When the timer
+    has fallen more than max_lag behind (a stall), the next wait is measured
+    from now rather than trying to catch up.
+
+    Sleeping uses the given sleep function (task.sleep, which also stops a
+    disabled task) in steps of at most chunk seconds, and stops spin seconds
+    before the deadline; the rest is busy-waited, since OS sleeps can
+    overshoot by a timer tick (~15 ms on Windows). cancel(), when given, is
+    checked before every sleep step and before spinning, never inside the
+    spin, and raises TimerCancelled when it returns True.
+    """
+
+    SPIN = 0.015
+    CHUNK = 0.05
+
+    def __init__(self, sleep: Callable = time.sleep, cancel: Callable = None, spin: float = SPIN,
+                 chunk: float = CHUNK, max_lag: float = 0.05):
+        self._sleep = sleep
+        self.cancel = cancel
+        self.spin = spin
+        self.chunk = chunk
+        self.max_lag = max_lag
+        self.deadline = time.perf_counter()
+
+    @staticmethod
+    def now() -> float:
+        return time.perf_counter()
+
+    def reset(self) -> float:
+        self.deadline = time.perf_counter()
+        return self.deadline
+
+    def wait(self, seconds: float) -> float:
+        """Sleep until seconds after the previous deadline, returns how late it woke up"""
+        now = time.perf_counter()
+        if now - self.deadline > self.max_lag:
+            self.deadline = now
+        self.deadline += max(0.0, seconds)
+        return self.sleep_until(self.deadline)
+
+    def sleep_until(self, deadline: float) -> float:
+        """Sleep until an absolute perf_counter time, returns how late it woke up"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return -remaining
+            if self.cancel is not None and self.cancel():
+                raise TimerCancelled()
+            if remaining <= self.spin:
+                break
+            self._sleep(min(self.chunk, remaining - self.spin))
+        while time.perf_counter() < deadline:
+            pass
+        return time.perf_counter() - deadline
@@ -0,0 +1,524 @@
+"""Template loading and matching helpers shared by the Choaga tasks"""
+import logging
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_FOLDER = "mod/fish"
+
+
+class Template:
+    """A decoded template image with its pre-converted grayscale (and mask) versions"""
+
+    __slots__ = ("name", "path", "bgr", "gray", "mask", "width", "height", "_scaled")
+
+    def __init__(self, name: str, path: str, bgr: np.ndarray, mask: np.ndarray = None):
+        self.name = name
+        self.path = path
+        self.bgr = bgr
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        self.mask = mask
+        self.height, self.width = self.gray.shape[:2]
+        self._scaled = {}
+
+    def scaled(self, scale: float) -> tuple:
+        """Downscaled (gray, mask) pair for the coarse pyramid pass, cached per scale"""
+        pair = self._scaled.get(scale)
+        if pair is None:
+            size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+            gray = cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA)
+            mask = None
+            if self.mask is not None:
+                mask = cv2.resize(self.mask, size, interpolation=cv2.INTER_NEAREST)
+            pair = self._scaled[scale] = (gray, mask)
+        return pair
+
+    @classmethod
+    def from_file(cls, path: str, name: str = None) -> "Template":
+        """Decode a PNG from disk (PIL handles non-ASCII paths on Windows)"""
+        with Image.open(path) as pil_img:
+            img_array = np.array(pil_img)
+        mask = None
+        if img_array.ndim == 2:
+            bgr = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
+        elif img_array.shape[2] == 4:
+            alpha = img_array[:, :, 3]
+            # Only keep a mask when the PNG actually has transparent pixels
+            if alpha.min() < 255:
+                mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
+            bgr = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
+        else:
+            bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        return cls(name or Path(path).stem, str(path), bgr, mask)
+
+
+class TemplateBank:
+    """Decodes every PNG in a folder once and serves the cached templates to all lookups
+
+    Templates can be requested by stem ("fish"), file name ("fish.png"), path
+    relative to the folder ("char/Lynn") or full path ("mod/fish/fish.png").
+    Files that were not preloaded (e.g. sub folders) are decoded on first use.
+    """
+
+    def __init__(self, folder: str = DEFAULT_TEMPLATE_FOLDER, preload: bool = True):
+        self.folder = folder
+        self._templates = {}
+        self._missing = set()
+        if preload:
+            self.load_all()
+
+    def load_all(self) -> int:
+        """Decode every top level PNG in the folder, returns the number of templates loaded"""
+        if not os.path.isdir(self.folder):
+            logger.warning(f"Template folder not found: {self.folder}")
+            return 0
+        loaded = 0
+        for image_path in sorted(Path(self.folder).glob("*.png")):
+            if self._load(image_path.stem, str(image_path)) is not None:
+                loaded += 1
+        logger.info(f"Loaded {loaded} templates from {self.folder}")
+        return loaded
+
+    def _key(self, name: str) -> tuple[str, str]:
+        """Normalize a template reference to (key, path)"""
+        path = Path(str(name).replace("\\", "/"))
+        if path.suffix.lower() == ".png":
+            path = path.with_suffix("")
+        folder = Path(self.folder)
+        if path.is_absolute():
+            folder = folder.resolve()
+        try:
+            key = path.relative_to(folder).as_posix()
+        except ValueError:
+            key = path.as_posix()
+        if path.is_absolute() or path.parts[:len(folder.parts)] == folder.parts:
+            file_path = f"{path.as_posix()}.png"
+        else:
+            file_path = (folder / f"{key}.png").as_posix()
+        return key, file_path
+
+    def _load(self, key: str, path: str):
+        try:
+            template = Template.from_file(path, name=Path(key).name)
+        except Exception as e:
+            logger.error(f"Failed to load template {path}: {e}")
+            self._missing.add(key)
+            return None
+        self._templates[key] = template
+        return template
+
+    def get(self, name: str):
+        """Return the cached Template for name, decoding it on first use, or None if unavailable"""
+        key, path = self._key(name)
+        template = self._templates.get(key)
+        if template is not None or key in self._missing:
+            return template
+        if not os.path.exists(path):
+            logger.warning(f"Template file not found: {path}")
+            self._missing.add(key)
+            return None
+        return self._load(key, path)
+
+
+_banks = {}
+
+
+def get_template_bank(folder: str = DEFAULT_TEMPLATE_FOLDER) -> TemplateBank:
+    """Return the process wide TemplateBank for folder, so every task shares one decoded copy"""
+    bank = _banks.get(folder)
+    if bank is None:
+        bank = _banks[folder] = TemplateBank(folder)
+    return bank
+
+
+def match_template(frame_gray: np.ndarray, template: Template, threshold: float = 0.7):
+    """Match a template against a grayscale image
+
+    Returns (score, (x, y, w, h)) of the best match when score >= threshold,
+    otherwise (score, None).
+    """
+    th, tw = template.height, template.width
+    if frame_gray is None or frame_gray.shape[0] < th or frame_gray.shape[1] < tw:
+        return 0.0, None
+    result = cv2.matchTemplate(frame_gray, template.gray, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if max_val >= threshold:
+        return max_val, (max_loc[0], max_loc[1], tw, th)
+    return max_val, None
+
+
+def pyramid_scale(template: Template, max_scale: float = 0.25, min_size: int = 12) -> float:
+    """Smallest power-of-two downscale (not below max_scale) that keeps the template at least min_size pixels"""
+    scale = 1.0
+    while scale / 2 >= max_scale and min(template.width, template.height) * scale / 2 >= min_size:
+        scale /= 2
+    return scale
+
+
+def _coarse_peaks(result: np.ndarray, min_score: float, count: int, radius: tuple):
+    """Top count peaks of a matchTemplate result, suppressing radius (rx, ry) around each pick"""
+    peaks = []
+    result = result.copy()
+    rx, ry = radius
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if max_val < min_score:
+            break
+        peaks.append((max_val, x, y))
+        result[max(0, y - ry):y + ry + 1, max(0, x - rx):x + rx + 1] = -1.0
+    return peaks
+
+
+def match_template_pyramid(frame_gray: np.ndarray, template: Template, threshold: float = 0.7,
+                           scale: float = None, candidates: int = 3, coarse_margin: float = 0.25,
+                           scaled_frame: np.ndarray = None):
+    """Coarse-to-fine template match with the same result as match_template
+
+    The downscaled frame is matched against the downscaled template to find up
+    to `candidates` peaks scoring at least threshold - coarse_margin. Only a
+    small window around each peak is then matched at full resolution, so the
+    returned score and (x, y, w, h) use the same threshold semantics as the
+    full match. Falls back to a full match when the template is too small to
+    downscale.
+    """
+    th, tw = template.height, template.width
+    if frame_gray is None or frame_gray.shape[0] < th or frame_gray.shape[1] < tw:
+        return 0.0, None
+    if scale is None:
+        scale = pyramid_scale(template)
+    if scale >= 1.0:
+        return match_template(frame_gray, template, threshold)
+
+    small_tpl, small_mask = template.scaled(scale)
+    if scaled_frame is None:
+        frame_h, frame_w = frame_gray.shape[:2]
+        scaled_frame = cv2.resize(frame_gray, (max(1, round(frame_w * scale)), max(1, round(frame_h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+    if scaled_frame.shape[0] < small_tpl.shape[0] or scaled_frame.shape[1] < small_tpl.shape[1]:
+        return match_template(frame_gray, template, threshold)
+    coarse = cv2.matchTemplate(scaled_frame, small_tpl, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+    peaks = _coarse_peaks(coarse, threshold - coarse_margin, candidates,
+                          (max(1, small_tpl.shape[1] // 2), max(1, small_tpl.shape[0] // 2)))
+
+    # Confirm each candidate at full resolution inside a window that covers the coarse quantization
+    pad = int(round(1 / scale)) + 2
+    frame_h, frame_w = frame_gray.shape[:2]
+    best_score, best_loc = 0.0, None
+    for _, cx, cy in peaks:
+        x0 = max(0, int(cx / scale) - pad)
+        y0 = max(0, int(cy / scale) - pad)
+        x1 = min(frame_w, int(cx / scale) + tw + pad)
+        y1 = min(frame_h, int(cy / scale) + th + pad)
+        window = frame_gray[y0:y1, x0:x1]
+        if window.shape[0] < th or window.shape[1] < tw:
+            continue
+        result = cv2.matchTemplate(window, template.gray, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val > best_score:
+            best_score, best_loc = max_val, (x0 + max_loc[0], y0 + max_loc[1])
+    if best_loc is not None and best_score >= threshold:
+        return best_score, (best_loc[0], best_loc[1], tw, th)
+    return best_score, None
+
+
+THUMBNAIL_WIDTH = 160
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute gray level difference between two thumbnails (0 = identical)"""
+    if a is None or b is None or a.shape != b.shape:
+        return 255.0
+    return float(cv2.absdiff(a, b).mean())
+
+
+def clip_region(region, frame_shape):
+    """Clip an (x, y, w, h) region to the frame, returns None when it covers the full frame"""
+    if region is None:
+        return None
+    frame_h, frame_w = frame_shape[:2]
+    x, y, w, h = (int(v) for v in region)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(frame_w, x + w), min(frame_h, y + h)
+    if x0 == 0 and y0 == 0 and x1 == frame_w and y1 == frame_h:
+        return None
+    if x1 <= x0 or y1 <= y0:
+        return (0, 0, 0, 0)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class FrameContext:
+    """Per-frame cache of the grayscale image, ROI crops and template match results
+
+    One context exists per captured frame (keyed on frame identity), so every
+    lookup on the same frame shares a single grayscale conversion and repeated
+    matches of the same template/region are free.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self._gray = None
+        self._gray_crops = {}
+        self._scaled = {}
+        self._matches = {}
+        self._thumbnail = None
+
+    @classmethod
+    def of(cls, frame: np.ndarray) -> "FrameContext":
+        """Return the context for frame, creating a new one when a new frame was captured"""
+        context = getattr(cls._local, "context", None)
+        if context is None or context.frame is not frame:
+            context = cls(frame)
+            cls._local.context = context
+        return context
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = to_gray(self.frame)
+        return self._gray
+
+    def crop(self, region) -> np.ndarray:
+        """BGR view of an (x, y, w, h) region (no copy)"""
+        region = clip_region(region, self.frame.shape)
+        if region is None:
+            return self.frame
+        x, y, w, h = region
+        return self.frame[y:y + h, x:x + w]
+
+    def gray_crop(self, region) -> np.ndarray:
+        """Grayscale view of an (x, y, w, h) region
+
+        Slices the full grayscale frame when it already exists, otherwise only
+        the region is converted (and cached).
+        """
+        region = clip_region(region, self.frame.shape)
+        if region is None:
+            return self.gray
+        x, y, w, h = region
+        if self._gray is not None:
+            return self._gray[y:y + h, x:x + w]
+        crop = self._gray_crops.get(region)
+        if crop is None:
+            crop = self._gray_crops[region] = to_gray(self.frame[y:y + h, x:x + w])
+        return crop
+
+    def gray_scaled(self, scale: float, region=None) -> np.ndarray:
+        """Downscaled grayscale view of a region for the coarse pyramid pass, cached per frame"""
+        region = clip_region(region, self.frame.shape)
+        key = (scale, region)
+        scaled = self._scaled.get(key)
+        if scaled is None:
+            gray = self.gray_crop(region)
+            size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+            scaled = self._scaled[key] = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return scaled
+
+    def thumbnail(self) -> np.ndarray:
+        """Small grayscale copy of the frame used for cheap frame-to-frame change detection"""
+        if self._thumbnail is None:
+            frame_h, frame_w = self.frame.shape[:2]
+            scale = THUMBNAIL_WIDTH / frame_w
+            size = (THUMBNAIL_WIDTH, max(1, round(frame_h * scale)))
+            small = cv2.resize(self.frame, size, interpolation=cv2.INTER_AREA)
+            self._thumbnail = to_gray(small)
+        return self._thumbnail
+
+    def match(self, template: Template, threshold: float = 0.7, region=None, mode: str = "full"):
+        """Match template inside region (full frame when None), cached per frame
+
+        mode is "full" for a plain full resolution match or "pyramid" for the
+        coarse-to-fine match. Returns (score, (x, y, w, h)) in frame coordinates
+        when score >= threshold, otherwise (score, None).
+        """
+        region = clip_region(region, self.frame.shape)
+        # Pyramid candidates depend on the threshold, plain matches are cached independent of it
+        key = (id(template), region, mode, threshold if mode == "pyramid" else None)
+        cached = self._matches.get(key)
+        if cached is None:
+            if mode == "pyramid":
+                scale = pyramid_scale(template)
+                scaled = self.gray_scaled(scale, region) if scale < 1.0 else None
+                score, match = match_template_pyramid(self.gray_crop(region), template, threshold,
+                                                      scale=scale, scaled_frame=scaled)
+            else:
+                score, match = match_template(self.gray_crop(region), template, threshold=-1.0)
+            if match is not None and region is not None:
+                match = (match[0] + region[0], match[1] + region[1], match[2], match[3])
+            # Keep a reference to the template so its id stays unique for this frame
+            cached = self._matches[key] = (template, score, match)
+        _, score, match = cached
+        if match is not None and score >= threshold:
+            return score, match
+        return score, None
+
+
+class SearchRegions:
+    """Per-template search region hints with a learned "last seen here" region
+
+    Hints are (x, y, w, h) at the reference resolution and are scaled to the
+    frame. Once a template is found, the region around the hit (plus margin)
+    replaces the hint for later searches. The full frame is the last
+    fallback for templates without a hint; for the others it is only scanned
+    on every full_frame_every-th miss, with the coarse-to-fine pyramid match,
+    so waiting for an absent image stays cheap. Each template is offset within that cycle (by a hash of its name) so the
+    full frame scans of templates polled together do not fall on the same
+    frame, and a miss right after a hit never rescans the full frame.
+    """
+
+    def __init__(self, hints: dict = None, ref_width: int = 1920, ref_height: int = 1080,
+                 margin: int = 24, full_frame_every: int = 5):
+        self.hints = dict(hints or {})
+        self.ref_width = ref_width
+        self.ref_height = ref_height
+        self.margin = margin
+        self.full_frame_every = max(1, full_frame_every)
+        self._learned = {}
+        self._misses = {}
+
+    def _scale(self, region, frame_shape):
+        frame_h, frame_w = frame_shape[:2]
+        sx, sy = frame_w / self.ref_width, frame_h / self.ref_height
+        x, y, w, h = region
+        return (round(x * sx), round(y * sy), round(w * sx), round(h * sy))
+
+    def regions(self, name: str, frame_shape) -> list:
+        """Regions to try in order for name, None stands for the full frame"""
+        learned = self._learned.get(name)
+        region = learned or self.hints.get(name)
+        if region is None:
+            return [None]
+        regions = [self._scale(region, frame_shape)]
+        if self._full_frame_due(name):
+            regions.append(None)
+        return regions
+
+    def _full_frame_due(self, name: str) -> bool:
+        misses = self._misses.get(name, 0)
+        return misses > 0 and (misses + zlib.crc32(name.encode()) % self.full_frame_every) % self.full_frame_every == 0
+
+    def learn(self, name: str, box, frame_shape):
+        """Remember where name was last seen (stored at the reference resolution)"""
+        frame_h, frame_w = frame_shape[:2]
+        sx, sy = self.ref_width / frame_w, self.ref_height / frame_h
+        x, y, w, h = box
+        m = self.margin
+        self._learned[name] = (x * sx - m, y * sy - m, w * sx + 2 * m, h * sy + 2 * m)
+        self._misses[name] = 0
+
+    def find(self, context: FrameContext, template: Template, threshold: float = 0.7, mode: str = "full"):
+        """Search the hinted/learned region first, then fall back to the full frame"""
+        best_score = 0.0
+        regions = self.regions(template.name, context.frame.shape)
+        for region in regions:
+            # The periodic full frame fallback behind a region is coarse-to-fine
+            region_mode = "pyramid" if region is None and len(regions) > 1 else mode
+            score, match = context.match(template, threshold, region, region_mode)
+            if match is not None:
+                self.learn(template.name, match, context.frame.shape)
+                return score, match
+            best_score = max(best_score, score)
+        self._misses[template.name] = self._misses.get(template.name, 0) + 1
+        return best_score, None
+
+
+def to_gray(frame: np.ndarray) -> np.ndarray:
+    """Convert a BGR (or BGRA) frame to grayscale, grayscale frames are returned as is"""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+_match_executor = None
+
+
+def get_match_executor(max_workers: int = None) -> ThreadPoolExecutor:
+    """Shared thread pool for parallel template matching (cv2.matchTemplate releases the GIL)"""
+    global _match_executor
+    if _match_executor is None:
+        workers = max_workers or min(4, os.cpu_count() or 1)
+        _match_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="choaga-match")
+    return _match_executor
+
+
+def match_all(context: FrameContext, templates, threshold: float = 0.7, search_regions: SearchRegions = None,
+              mode: str = "full", parallel: bool = False) -> list:
+    """Evaluate several templates against one prepared frame, returns [(score, match), ...] in order"""
+
+    def evaluate(template):
+        if search_regions is not None:
+            return search_regions.find(context, template, threshold, mode)
+        return context.match(template, threshold, mode=mode)
+
+    if parallel and len(templates) > 1:
+        # Convert the frame once up front so the workers only read shared state
+        _ = context.gray
+        return list(get_match_executor().map(evaluate, templates))
+    return [evaluate(template) for template in templates]
+
+
+def match_best(context: FrameContext, templates, threshold: float = 0.7, search_regions: SearchRegions = None,
+               mode: str = "full", parallel: bool = False):
+    """Evaluate several templates against one prepared frame and return the best
+
+    Returns (name, score, (x, y, w, h)) of the highest scoring template that
+    reaches threshold, or (None, best_score, None) when none does.
+    """
+    templates = [t for t in templates if t is not None]
+    if not templates:
+        return None, 0.0, None
+    results = match_all(context, templates, threshold, search_regions, mode, parallel)
+
+    best = (None, 0.0, None)
+    best_miss = 0.0
+    for template, (score, match) in zip(templates, results):
+        if match is not None:
+            if best[2] is None or score > best[1]:
+                best = (template.name, score, match)
+        else:
+            best_miss = max(best_miss, score)
+    if best[2] is None:
+        return None, best_miss, None
+    return best
+
+
+class ScreenClassifier:
+    """Identifies the current UI screen from its marker templates
+
+    screens is a list of (screen_name, [Template, ...]) in priority order: when
+    markers of several screens are visible (e.g. a tab bar that stays on screen
+    in deeper menus) the first listed screen wins, so screens are matched in
+    that order and the first hit ends the evaluation.
+    """
+
+    def __init__(self, screens, threshold: float = 0.7):
+        self.threshold = threshold
+        self.screens = [(screen, [t for t in templates if t is not None]) for screen, templates in screens]
+
+    def classify(self, context: FrameContext, search_regions: SearchRegions = None, parallel: bool = True,
+                 screens=None):
+        """Return (screen_name, template_name, score, (x, y, w, h)), or (None, None, best_score, None)
+
+        screens restricts the evaluation to the screens the caller can expect
+        (all screens when None).
+        """
+        best_miss = 0.0
+        for screen, templates in self.screens:
+            if screens is not None and screen not in screens:
+                continue
+            name, score, match = match_best(context, templates, self.threshold, search_regions, parallel=parallel)
+            if match is not None:
+                return screen, name, score, match
+            best_miss = max(best_miss, score)
+        return None, None, best_miss, None
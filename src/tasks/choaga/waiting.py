@@ -0,0 +1,93 @@
+"""Frame-driven wait engine shared by the Choaga tasks"""
+import time
+from typing import Callable, NamedTuple
+
+from src.tasks.choaga.vision import FrameContext, frame_difference
+
+
+class WaitResult(NamedTuple):
+    """Outcome of wait_until_any: which condition fired, its value and how long it took"""
+    name: str
+    value: object
+    elapsed: float
+    frames: int
+
+
+def wait_until_any(task, conditions: dict, timeout: float = 10.0, min_interval: float = 0.0,
+                   on_frame: Callable = None):
+    """Evaluate every condition on each newly captured frame until one is satisfied
+
+    conditions maps a name to a callable returning a truthy value when met
+    (e.g. a Box). They are checked in order on the current frame first, then
+    again as soon as task.next_frame() delivers a new one, instead of sleeping
+    a fixed poll interval between checks. min_interval optionally throttles
+    the loop. on_frame, if given, is called once per evaluated frame before the
+    conditions (e.g. to keep a key pressed).
+
+    Returns a WaitResult for the first satisfied condition, or None on timeout.
+    Cancellation is handled by the task's own sleep/next_frame.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    frames = 0
+    while True:
+        frame_time = time.monotonic()
+        frames += 1
+        if on_frame is not None:
+            on_frame()
+        for name, condition in conditions.items():
+            value = condition()
+            if value:
+                return WaitResult(name, value, time.monotonic() - start, frames)
+        if time.monotonic() >= deadline:
+            return None
+        if min_interval > 0:
+            remaining = min_interval - (time.monotonic() - frame_time)
+            if remaining > 0:
+                task.sleep(min(remaining, max(0.0, deadline - time.monotonic())))
+        task.next_frame()
+
+
+class SettleResult(NamedTuple):
+    """Outcome of wait_until_settled: whether the screen settled before max_wait and how long it took"""
+    settled: bool
+    changed: bool
+    elapsed: float
+    frames: int
+
+
+def wait_until_settled(task, max_wait: float = 1.0, stable_time: float = 0.15, threshold: float = 1.5,
+                       change_timeout: float = 0.4):
+    """Wait until the screen stops changing, with max_wait as the upper bound
+
+    Consecutive frames are compared on small grayscale thumbnails. A UI
+    transition normally starts shortly after the input, so the screen first
+    has to change (or change_timeout pass without any change) and then stay
+    below threshold for stable_time seconds.
+    """
+    start = time.monotonic()
+    deadline = start + max_wait
+    previous = FrameContext.of(task.frame).thumbnail()
+    changed = False
+    stable_since = None
+    frames = 0
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            return SettleResult(False, changed, now - start, frames)
+        task.next_frame()
+        frames += 1
+        now = time.monotonic()
+        current = FrameContext.of(task.frame).thumbnail()
+        moving = frame_difference(previous, current) > threshold
+        previous = current
+        if moving:
+            changed = True
+            stable_since = None
+            continue
+        if not changed and now - start < change_timeout:
+            continue
+        if stable_since is None:
+            stable_since = now
+        if now - stable_since >= stable_time:
+            return SettleResult(True, changed, now - start, frames)
@@ -1,15 +1,25 @@
 from qfluentwidgets import FluentIcon
 import time
-import re
 import os
-import cv2
-import numpy as np
 from pathlib import Path
-from PIL import Image
 
 from ok import Logger, TaskDisabledException, Box
 from src.tasks.BaseDNATask import BaseDNATask
 from src.tasks.DNAOneTimeTask import DNAOneTimeTask
+from src.tasks.choaga.fight import (CONTROLLERS, DETECTOR_METHODS, FightController, FightObservation,
+                                   FishBarDetector, create_controller)
+from src.tasks.choaga.hud import BITE_SLOT_ICONS, HudDetector, HudReading, HudState
+from src.tasks.choaga.ledger import (CAUGHT, END_FAILED, FIGHT_TIMEOUT, NAVIGATION, NO_MORE_FISH, ROUND,
+                                     START_TIMEOUT, SessionLedger)
+from src.tasks.choaga.navigation import NavigationInterpreter
+from src.tasks.choaga.pipeline import DetectionPipeline
+from src.tasks.choaga.scripts import ScriptError, get_script_cache
+from src.tasks.choaga.recording import SESSION_EXTENSION, SessionRecorder
+from src.tasks.choaga.routes import ROUTE_EXTENSION, RouteOptimizer
+from src.tasks.choaga.telemetry import LatencyRecorder
+from src.tasks.choaga.timeouts import PhaseTimeouts
+from src.tasks.choaga.vision import FrameContext, ScreenClassifier, SearchRegions, Template, get_template_bank
+from src.tasks.choaga.waiting import wait_until_any, wait_until_settled
 
 logger = Logger.get_logger(__name__)
 
@@ -23,6 +33,47 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
     ICON_MIN_AREA = 70
     ICON_MAX_AREA = 400
     CONTROL_ZONE_RATIO = 0.25
+    MERGE_GRACE_SECONDS = 0.20
+    HUD_THRESHOLD = 0.8
+    # read_hud() icons and the fused detector templates of each
+    HUD_ICONS = {"cast": ("fish_cast", "fish_ease"), "bite": ("fish_bite",), "chance": ("fish_chance",)}
+    BITE_CONFIRM_FRAMES = 2
+    FIGHT_LATENCY_DUMP = "logs/fight_latency.csv"
+    SESSION_FOLDER = "logs/sessions"
+    ROUTE_FOLDER = "logs/routes"
+    PHASE_DURATIONS_FILE = "logs/phase_durations.json"
+    PHASE_DURATIONS_SAVE_INTERVAL = 300.0
+    LEDGER_FILE = "logs/fishing_ledger.jsonl"
+    ROUTE_ARRIVAL_PNG = "mod/fish/fish.png"
+    ROUTE_ARRIVAL_TIMEOUT = 5.0
+    
+    # Menu steps from the game world to the spot teleport: (step / screen name, images to click)
+    NAVIGATION_STEPS = [
+        ("inventory", ["inventory", "inventory2"]),
+        ("fishingsupplies", ["fishingsupplies", "fishingsupplies2"]),
+        ("rod", ["rod", "rod2"]),
+        ("inventory3", ["inventory3"]),
+        ("locatefishing", ["locatefishing"]),
+        ("teleport", ["teleport"]),
+    ]
+    NAVIGATION_STEP_TIMEOUT = 10.0
+    MAX_NAVIGATION_RECOVERIES = 3
+    
+    # Where each menu template shows up (x, y, w, h at 1920x1080), searched before the full frame.
+    # Kept generous on purpose: the region where a template is actually found is learned and used afterwards.
+    SEARCH_REGION_HINTS = {
+        "inventory": (960, 0, 960, 1080),
+        "inventory2": (960, 0, 960, 1080),
+        "fishingsupplies": (0, 0, 1920, 360),
+        "fishingsupplies2": (0, 0, 1920, 360),
+        "rod": (0, 0, 1280, 1080),
+        "rod2": (0, 0, 1280, 1080),
+        "inventory3": (960, 540, 960, 540),
+        "locatefishing": (960, 540, 960, 540),
+        "teleport": (960, 540, 960, 540),
+        "Purgatorio": (0, 0, 1920, 540),
+        "Icelake": (0, 0, 1920, 540),
+    }
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -44,6 +95,19 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             "Enable Purgatorio": True,  # Enable/disable Purgatorio fishing spot
             "Enable Icelake": True,  # Enable/disable Icelake fishing spot
             "Enable Sewers": True,  # Enable/disable Sewers fishing spot
+            "Fish Bar Detector": "Contours",  # Contours or Projection
+            "Fight Controller": "Bang-Bang",  # Bang-Bang or Predictive
+            "Predictive Latency (ms)": 60,  # Capture-to-input delay compensated by the predictive controller
+            "Dump Fight Latency": False,  # Write logs/fight_latency.csv after each fight
+            "Pipelined Fight": False,  # Capture + detect in a worker thread during the fight
+            "Record Sessions": False,  # Record fish/icon ROI frames and inputs to logs/sessions
+            "Spot Routes": False,  # Replay mod/fish/<spot>.py after the teleport instead of the built-in movement
+            "Compress Routes": False,  # Shorten spot script sleeps, verified by fish.png after each route
+            "Fused HUD Detector": False,  # Score cast/bite/ease/chance icons in one grayscale pass per frame
+            "Fast Bite Reaction": False,  # Press space as soon as the reel prompt is confirmed after the bite
+            "Bite Settle Time": 0.5,  # Seconds fish_bite must stay gone before looking for the reel prompt
+            "Adaptive Timeouts": True,  # Phase timeouts from recent round durations per spot, capped by the above
+            "Session Ledger": True,  # Append one record per round / navigation to logs/fishing_ledger.jsonl
         })
         
         # Config descriptions
@@ -59,7 +123,29 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             "Enable Purgatorio": "Enable fishing at Purgatorio spot",
             "Enable Icelake": "Enable fishing at Icelake spot",
             "Enable Sewers": "Enable fishing at Sewers spot",
+            "Fish Bar Detector": "Fight phase bar/icon detector (Projection = row/column projections, contours only for "
+                                 "pieces that are not solid; same bar/icon as Contours)",
+            "Fight Controller": "Space hold logic in the fight (Predictive = compensates input latency)",
+            "Predictive Latency (ms)": "Capture-to-input delay the predictive controller looks ahead by",
+            "Dump Fight Latency": "Write fight loop timings (last 4096 iterations) to logs/fight_latency.csv",
+            "Pipelined Fight": "Detect in a worker thread, the control loop always uses the newest frame",
+            "Record Sessions": "Record fish/icon ROI frames and inputs per round to logs/sessions (for offline replay)",
+            "Spot Routes": "Replay the recorded route mod/fish/<spot>.py (when present) after the teleport "
+                           "instead of the built-in movement",
+            "Compress Routes": "Shorten the recorded sleeps of the spot routes (needs Spot Routes) one step per run "
+                               "while fish.png is still reached (logs/routes, recorded timings are the fallback)",
+            "Fused HUD Detector": "Detect the cast/bite/chance icons with one crop and grayscale TM_CCOEFF_NORMED "
+                                  "match pass per frame (scores differ from find_one; off = one find_one per icon)",
+            "Fast Bite Reaction": "Watch only the bite icon slot on every frame and reel as soon as the prompt shows "
+                                  "on consecutive frames (needs the fused HUD detector, skips the settle time)",
+            "Bite Settle Time": "Seconds fish_bite must stay gone before waiting for the reel prompt (normal path)",
+            "Adaptive Timeouts": "Derive phase timeouts from the 95th percentile of recent phase durations at the spot "
+                                 "plus a margin (timed-out phases count as MAX_*_SEC); MAX_*_SEC stay the upper limits",
+            "Session Ledger": "Keep a history of every round (spot, phase times, chance, outcome, fused HUD detector "
+                              "scores) and navigation in logs/fishing_ledger.jsonl",
         })
+        self.config_type["Fish Bar Detector"] = {"type": "drop_down", "options": ["Contours", "Projection"]}
+        self.config_type["Fight Controller"] = {"type": "drop_down", "options": ["Bang-Bang", "Predictive"]}
         
         # Fishing spot scripts (in order: Purgatorio -> Icelake -> Sewers)
         self.spot_scripts = [
@@ -68,9 +154,26 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             {"name": "Sewers", "py": "mod/fish/Sewers.py", "png": "mod/fish/Sewers.png", "e_count": 2},
         ]
         
-        # Load menu images from mod/fish folder
+        # Load menu images from mod/fish folder (decoded once, shared by all lookups)
+        self.template_bank = get_template_bank("mod/fish")
+        self.search_regions = SearchRegions(self.SEARCH_REGION_HINTS)
+        self.fight_latency = LatencyRecorder()
+        self.session_recorder = None
+        self.route_optimizers = {}
+        self._hud_detector = None
+        self._hud_reading = (None, None, None)
+        self.current_spot_name = ""
+        self.phase_timeouts = PhaseTimeouts.load(self.PHASE_DURATIONS_FILE)
+        self._phase_durations_saved = time.monotonic()
+        self.ledger = None
         self.menu_images = {}
         self.load_menu_images()
+        # Deepest menu step first: tabs of earlier menus can stay visible on later screens
+        self.screen_classifier = ScreenClassifier(
+            [(step, [self.menu_images.get(name) for name in image_names])
+             for step, image_names in reversed(self.NAVIGATION_STEPS)]
+            + [(banner, [self.menu_images.get(banner)]) for banner in ("Purgatorio", "Icelake")]
+        )
         
     def run(self):
         DNAOneTimeTask.run(self)
@@ -81,6 +184,9 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         except Exception as e:
             logger.error(f"AutoFishMultiSpotTask error: {e}")
             raise
+        finally:
+            self.save_phase_durations(force=True)
+            self.close_ledger()
     
     def init(self):
         """Initialize fishing spots"""
@@ -105,87 +211,68 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         self.info_set("Current Phase", "Preparing")
     
     def load_menu_images(self):
-        """Load menu images from mod/fish folder"""
-        mod_folder = "mod/fish"
-        if not os.path.exists(mod_folder):
-            logger.warning(f"Mod folder not found: {mod_folder}")
-            return
-        
+        """Load menu images from the shared mod/fish template bank"""
         menu_image_names = ["inventory", "fishingsupplies", "fishingsupplies2", "inventory2", "inventory3", "locatefishing", "teleport", "rod", "rod2", "Purgatorio", "Icelake"]
         
         for image_name in menu_image_names:
-            image_path = os.path.join(mod_folder, f"{image_name}.png")
-            if os.path.exists(image_path):
-                try:
-                    pil_img = Image.open(image_path)
-                    img_array = np.array(pil_img)
-                    # Convert RGB to BGR for OpenCV
-                    template = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-                    self.menu_images[image_name] = template
-                    logger.info(f"Loaded menu image: {image_name}")
-                except Exception as e:
-                    logger.error(f"Failed to load image {image_name}: {e}")
-            else:
-                logger.warning(f"Image file not found: {image_path}")
+            template = self.template_bank.get(image_name)
+            if template is not None:
+                self.menu_images[image_name] = template
+                logger.info(f"Loaded menu image: {image_name}")
+    
+    def get_template(self, png_path: str):
+        """Get a cached template from the bank by name or PNG path (None if missing)"""
+        return self.template_bank.get(png_path)
+    
+    def vision_context(self) -> FrameContext:
+        """Per-frame vision cache (gray image, crops, match results) for the current frame"""
+        return FrameContext.of(self.frame)
     
-    def find_image_template(self, template_img, threshold: float = 0.7):
-        """Find template image in current frame using template matching"""
+    def find_image_template(self, template_img, threshold: float = 0.7, mode: str = "full"):
+        """Find template image in current frame using template matching
+
+        mode="pyramid" matches a downscaled frame first and only confirms the
+        candidate peaks at full resolution (same threshold and Box result).
+        """
         if template_img is None:
             return None
         
-        frame = self.frame
-        if frame is None:
+        if self.frame is None:
             return None
         
-        # Convert frame to BGR if needed
-        if len(frame.shape) == 3:
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            template_gray = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
-        else:
-            frame_gray = frame
-            template_gray = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
-        
-        # Template matching
-        result = cv2.matchTemplate(frame_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        # Raw BGR arrays are still accepted, but bank templates skip the per-call conversion
+        if not isinstance(template_img, Template):
+            template_img = Template("", "", template_img)
         
-        if max_val >= threshold:
-            h, w = template_gray.shape[:2]
-            x = max_loc[0]
-            y = max_loc[1]
+        # The frame is converted to gray once and shared by every lookup on it
+        context = self.vision_context()
+        if template_img.name:
+            # Hinted / last-seen region first, full frame as fallback
+            _, match = self.search_regions.find(context, template_img, threshold, mode)
+        else:
+            _, match = context.match(template_img, threshold, mode=mode)
+        if match:
             # Return a Box object (x, y, width, height)
-            return Box(x, y, w, h)
+            return Box(*match)
         
         return None
     
     def wait_for_png(self, png_path: str, timeout: float = 10.0) -> bool:
         """Wait for PNG image to appear on screen using template matching"""
         logger.info(f"Waiting for PNG image: {png_path}")
-        deadline = time.monotonic() + timeout
         
         # Load template image
-        if not os.path.exists(png_path):
-            logger.error(f"PNG file not found: {png_path}")
-            return False
-        
-        try:
-            pil_img = Image.open(png_path)
-            img_array = np.array(pil_img)
-            template = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            logger.error(f"Failed to load PNG template {png_path}: {e}")
+        template = self.get_template(png_path)
+        if template is None:
+            logger.error(f"PNG template not available: {png_path}")
             return False
         
-        while time.monotonic() < deadline:
-            box = self.find_image_template(template, threshold=0.7)
-            if box:
-                image_name = Path(png_path).stem
-                logger.info(f"Found PNG image: {image_name}")
-                return True
-            self.sleep(0.2)  # sleep() will raise TaskDisabledException if disabled
-            self.next_frame()
-        
+        result = self.wait_until_any({"found": lambda: self.find_image_template(template, threshold=0.7)}, timeout)
         image_name = Path(png_path).stem
+        if result:
+            logger.info(f"Found PNG image: {image_name} ({result.elapsed:.2f}s)")
+            return True
+        
         logger.warning(f"Timeout waiting for PNG image: {image_name}")
         return False
     
@@ -195,10 +282,22 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         self.click(x, y)
         self.sleep(delay)
     
+    def wait_until_any(self, conditions: dict, timeout: float = 10.0, min_interval: float = 0.0, on_frame=None):
+        """Check all conditions on every new frame, returns the first satisfied WaitResult or None"""
+        result = wait_until_any(self, conditions, timeout, min_interval=min_interval, on_frame=on_frame)
+        if result:
+            logger.debug(f"Condition '{result.name}' met after {result.elapsed:.3f}s ({result.frames} frames)")
+        return result
+    
+    def wait_screen_settled(self, max_wait: float = 1.0):
+        """Return as soon as the screen stops changing, max_wait (the old fixed delay) is the upper bound"""
+        result = wait_until_settled(self, max_wait)
+        logger.debug(f"Screen {'settled' if result.settled else 'still changing'} after {result.elapsed:.2f}s")
+        return result
+    
     def wait_for_image(self, image_name: str, timeout: float = 10.0) -> bool:
         """Wait for an image to appear on screen (without clicking)"""
         logger.info(f"Waiting for {image_name}.png to appear...")
-        deadline = time.monotonic() + timeout
         
         if image_name not in self.menu_images:
             logger.error(f"Image {image_name} not loaded in menu_images")
@@ -206,139 +305,126 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         
         template = self.menu_images[image_name]
         
-        while time.monotonic() < deadline:
-            box = self.find_image_template(template, threshold=0.7)
-            if box:
-                logger.info(f"Found {image_name}.png - map loaded!")
-                return True
-            
-            self.sleep(0.2)
-            self.next_frame()
+        # Map banners are large, a coarse pass first is much cheaper per frame
+        result = self.wait_until_any(
+            {image_name: lambda: self.find_image_template(template, threshold=0.7, mode="pyramid")}, timeout)
+        if result:
+            logger.info(f"Found {image_name}.png - map loaded! ({result.elapsed:.2f}s)")
+            return True
         
         logger.warning(f"Timeout: Could not find {image_name}.png after {timeout} seconds")
         return False
     
-    def find_and_click_image(self, image_name: str, timeout: float = 10.0, delay: float = 1.0) -> bool:
-        """Find an image on screen and click it"""
-        logger.info(f"Looking for {image_name}.png...")
-        deadline = time.monotonic() + timeout
-        
-        if image_name not in self.menu_images:
-            logger.error(f"Image {image_name} not loaded in menu_images")
-            return False
-        
-        template = self.menu_images[image_name]
-        
-        while time.monotonic() < deadline:
-            box = self.find_image_template(template, threshold=0.7)
-            if box:
-                # Click at the center of the found image
-                center_x = box.x + box.width // 2
-                center_y = box.y + box.height // 2
-                logger.info(f"Found {image_name}.png at ({center_x}, {center_y}), clicking...")
-                self.click(center_x, center_y)
-                self.sleep(delay)
-                return True
-            
-            self.sleep(0.2)
-            self.next_frame()
-        
-        logger.warning(f"Timeout: Could not find {image_name}.png after {timeout} seconds")
-        return False
+    def classify_screen(self, screens=None):
+        """Identify the current navigation screen from the mod/fish templates (only screens when given)"""
+        if self.frame is None:
+            return None, None
+        screen, _, score, match = self.screen_classifier.classify(self.vision_context(), self.search_regions,
+                                                                  screens=screens)
+        if screen is None:
+            return None, None
+        logger.debug(f"Current screen: {screen} ({score:.2f})")
+        return screen, Box(*match)
     
-    def find_and_click_image_optional(self, image_names: list, timeout: float = 10.0, delay: float = 1.0) -> bool:
-        """Find one of multiple images on screen and click it (tries each in order)"""
-        logger.info(f"Looking for one of: {', '.join([f'{name}.png' for name in image_names])}...")
-        deadline = time.monotonic() + timeout
-        
-        # Check which images are loaded
-        available_templates = {}
-        for image_name in image_names:
-            if image_name in self.menu_images:
-                available_templates[image_name] = self.menu_images[image_name]
-        
-        if not available_templates:
-            logger.error(f"None of the images {image_names} are loaded in menu_images")
-            return False
-        
-        while time.monotonic() < deadline:
-            # Try each image in order
-            for image_name, template in available_templates.items():
-                box = self.find_image_template(template, threshold=0.7)
-                if box:
-                    # Click at the center of the found image
-                    center_x = box.x + box.width // 2
-                    center_y = box.y + box.height // 2
-                    logger.info(f"Found {image_name}.png at ({center_x}, {center_y}), clicking...")
-                    self.click(center_x, center_y)
-                    self.sleep(delay)
-                    return True
-            
-            self.sleep(0.2)
-            self.next_frame()
-        
-        logger.warning(f"Timeout: Could not find any of {image_names} after {timeout} seconds")
-        return False
+    def press_e_for_spot(self, e_count: int):
+        """Press E e_count times to select the spot tab in the fish collection"""
+        for i in range(e_count):
+            logger.info(f"Pressing E key ({i+1}/{e_count})")
+            # Use explicit down/up for better reliability
+            self.send_key_down("e")
+            self.sleep(0.2)  # Hold key down for 0.2 seconds
+            self.send_key_up("e")
+            self.wait_screen_settled(1.0)  # Wait for the menu to respond (up to 1 second)
     
     def navigate_to_fishing_spot(self, spot_name: str, e_count: int = 0):
-        """Navigate through menu to fishing spot teleport using image detection"""
+        """Navigate through menu to fishing spot teleport using image detection
+
+        Every poll classifies the current screen once, so navigation jumps straight
+        to the step matching what is on screen (e.g. a half-open menu) instead of
+        waiting out a timeout for each step it expected. Polls only match the
+        screens that can follow the current step; all screens are matched when
+        navigation starts and when a step times out.
+        """
         logger.info(f"Navigating to {spot_name} fishing spot (E count: {e_count})")
+        step_names = [name for name, _ in self.NAVIGATION_STEPS]
+        locate_index = step_names.index("locatefishing")
         
-        # Step 1: Press ESC
-        logger.info("Pressing ESC")
-        self.send_key("esc", down_time=0.1)
-        self.sleep(1.0)
+        # Step 1: Press ESC (skipped when a navigation menu is already open)
         self.next_frame()
-        
-        # Step 2: Find and click inventory.png
-        logger.info("Step 2: Looking for inventory.png...")
-        if not self.find_and_click_image("inventory", timeout=10.0, delay=1.0):
-            logger.error("Failed to find inventory.png")
-            return False
-        
-        # Step 2.5: Find and click fishingsupplies.png or fishingsupplies2.png
-        logger.info("Step 2.5: Looking for fishingsupplies.png or fishingsupplies2.png...")
-        if not self.find_and_click_image_optional(["fishingsupplies", "fishingsupplies2"], timeout=10.0, delay=1.0):
-            logger.error("Failed to find fishingsupplies.png or fishingsupplies2.png")
-            return False
-        
-        # Step 3: Find and click rod.png or rod2.png
-        logger.info("Step 3: Looking for rod.png or rod2.png...")
-        if not self.find_and_click_image_optional(["rod", "rod2"], timeout=10.0, delay=1.0):
-            logger.error("Failed to find rod.png or rod2.png")
-            return False
-        
-        # Step 4: Find and click inventory3.png
-        logger.info("Step 4: Looking for inventory3.png...")
-        if not self.find_and_click_image("inventory3", timeout=10.0, delay=1.0):
-            logger.error("Failed to find inventory3.png")
-            return False
-        
-        # Step 5: Press E key (if needed) - before locatefishing click
-        if e_count > 0:
-            logger.info(f"Waiting 2 seconds after clicking inventory3 for menu to load...")
-            self.sleep(2.0)
-            self.next_frame()  # Update frame before pressing E
-            for i in range(e_count):
-                logger.info(f"Pressing E key ({i+1}/{e_count})")
-                # Use explicit down/up for better reliability
-                self.send_key_down("e")
-                self.sleep(0.2)  # Hold key down for 0.2 seconds
-                self.send_key_up("e")
-                self.sleep(1.0)  # Wait after each E press for menu to respond
-                self.next_frame()  # Update frame after each E press
-        
-        # Step 6: Find and click locatefishing.png
-        logger.info("Step 6: Looking for locatefishing.png...")
-        if not self.find_and_click_image("locatefishing", timeout=10.0, delay=1.0):
-            logger.error("Failed to find locatefishing.png")
-            return False
-        
-        # Step 7: Find and click teleport.png
-        logger.info("Step 7: Looking for teleport.png...")
-        if not self.find_and_click_image("teleport", timeout=10.0, delay=1.0):
-            logger.error("Failed to find teleport.png")
-            return False
+        screen, _ = self.classify_screen()
+        step_index = 0
+        if screen in step_names and step_names.index(screen) <= locate_index:
+            logger.info(f"Navigation menu already open at {screen}, skipping ESC")
+            step_index = step_names.index(screen)
+        else:
+            logger.info("Pressing ESC")
+            self.send_key("esc", down_time=0.1)
+            self.wait_screen_settled(1.0)
+        
+        spot_selected = e_count <= 0
+        recoveries = 0
+        deadline = time.monotonic() + self.NAVIGATION_STEP_TIMEOUT
+        logger.info(f"Step {step_index + 2}: Looking for {self.NAVIGATION_STEPS[step_index][0]}...")
+        while True:
+            # The current step, the one after it and a map opened before the spot tab was chosen
+            expected = step_names[step_index:step_index + 2]
+            if not spot_selected:
+                expected += [name for name in step_names[locate_index + 1:] if name not in expected]
+            screen, box = self.classify_screen(expected)
+            screen_index = step_names.index(screen) if screen in step_names else None
+            
+            if screen_index is not None and screen_index > locate_index and not spot_selected:
+                # A map opened before the spot tab was chosen may belong to another spot
+                if recoveries >= self.MAX_NAVIGATION_RECOVERIES:
+                    logger.error(f"Could not leave {screen} to select the spot")
+                    return False
+                recoveries += 1
+                logger.info(f"{screen} is open before selecting the spot, pressing ESC")
+                self.send_key("esc", down_time=0.1)
+                self.wait_screen_settled(1.0)
+                continue
+            elif screen_index is not None and screen_index >= step_index:
+                if screen_index > step_index:
+                    logger.info(f"Screen is already at {screen}, skipping ahead")
+                if screen_index == locate_index and not spot_selected:
+                    # Step 5: Press E key (if needed) - before locatefishing click
+                    self.press_e_for_spot(e_count)
+                    spot_selected = True
+                    step_index = screen_index
+                    continue
+                center_x = box.x + box.width // 2
+                center_y = box.y + box.height // 2
+                logger.info(f"Found {screen} at ({center_x}, {center_y}), clicking...")
+                self.click(center_x, center_y)
+                step_index = screen_index + 1
+                if step_index >= len(self.NAVIGATION_STEPS):
+                    break
+                self.wait_screen_settled(1.0)
+                deadline = time.monotonic() + self.NAVIGATION_STEP_TIMEOUT
+                logger.info(f"Step {step_index + 2}: Looking for {self.NAVIGATION_STEPS[step_index][0]}...")
+                continue
+            elif time.monotonic() >= deadline:
+                step_name = self.NAVIGATION_STEPS[step_index][0]
+                screen, _ = self.classify_screen()
+                screen_index = step_names.index(screen) if screen in step_names else None
+                if recoveries >= self.MAX_NAVIGATION_RECOVERIES:
+                    logger.error(f"Failed to find {step_name}.png")
+                    return False
+                recoveries += 1
+                if screen_index is not None:
+                    # The menu is at another step than expected, continue from there
+                    logger.warning(f"Timeout waiting for {step_name}.png, screen is at {screen}, resuming from there")
+                    step_index = screen_index
+                else:
+                    logger.warning(f"Timeout waiting for {step_name}.png, no menu recognized, pressing ESC")
+                    self.send_key("esc", down_time=0.1)
+                    self.wait_screen_settled(1.0)
+                    step_index = 0
+                    deadline = time.monotonic() + self.NAVIGATION_STEP_TIMEOUT
+                    continue
+                deadline = time.monotonic() + self.NAVIGATION_STEP_TIMEOUT
+            # Re-classify as soon as the next frame arrives instead of a fixed poll sleep
+            self.next_frame()
         
         # Step 8: Wait for map to load - use image detection for Purgatorio and Icelake, fixed wait for Sewers
         if spot_name == "Sewers":
@@ -357,183 +443,71 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info(f"Successfully navigated to {spot_name}")
         return True
     
-    def execute_spot_script(self, script_path: str, png_path: str):
-        """Execute a spot navigation script, checking for PNG before W key presses"""
+    def execute_spot_script(self, script_path: str, png_path: str) -> tuple[bool, bool]:
+        """Execute a spot navigation script, returns (executed, arrived)
+
+        executed is True once the route inputs were sent (even when the route
+        failed part way), arrived is the fish.png arrival checkpoint result
+        (only checked with "Compress Routes", None otherwise).
+        """
         logger.info(f"Executing script: {script_path}")
         
         # Read and parse the script (using relative path from working directory)
         if not os.path.exists(script_path):
             logger.error(f"Script file not found: {script_path}")
-            return False
-        
-        with open(script_path, 'r', encoding='utf-8') as f:
-            script_content = f.read()
+            return False, False
         
-        # Execute the script with pyautogui calls replaced by ok-dna methods
-        logger.info("Executing script actions...")
+        # Parsed into navigation actions once per file content (unsupported statements fail here)
         try:
-            # Create a modified script that uses ok-dna methods
-            modified_script = script_content
-            
-            # Remove pyautogui import statements
-            modified_script = re.sub(r'^import pyautogui\s*$', '', modified_script, flags=re.MULTILINE)
-            modified_script = re.sub(r'^from pyautogui import.*$', '', modified_script, flags=re.MULTILINE)
-            
-            # Remove all mouse movement lines (moveTo) - we'll click directly at coordinates
-            modified_script = re.sub(r'^.*pyautogui\.moveTo.*$', '', modified_script, flags=re.MULTILINE)
-            
-            # Skip all actions until the first W key press
-            # Find the first W key press and remove everything before it
-            # This skips the initial ESC and any mouse clicks that happen before walking
-            w_pattern = r'pyautogui\.press\([\'"]w[\'"]\)'
-            w_match = re.search(w_pattern, modified_script, re.IGNORECASE)
-            if w_match:
-                # Remove everything before the first W press
-                modified_script = modified_script[w_match.start():]
-                logger.debug("Skipped all actions before first W key press")
-            else:
-                # If no W press found, skip the first ESC sequence and early mouse actions
-                # Skip first ESC press sequence
-                patterns = [
-                    r'^time\.sleep\([^)]+\)\s*\n\s*pyautogui\.press\([\'"]esc[\'"]\)\s*\n\s*time\.sleep\([^)]+\)\s*\n',
-                    r'time\.sleep\([^)]+\)\s*\n\s*pyautogui\.press\([\'"]esc[\'"]\)\s*\n\s*time\.sleep\([^)]+\)',
-                ]
-                for pattern in patterns:
-                    modified_script = re.sub(pattern, '', modified_script, count=1, flags=re.MULTILINE)
-                
-                # Skip first few mouseDown/mouseUp pairs (usually 2-3 clicks)
-                mouse_pattern = r'pyautogui\.mouseDown\([^)]+\)\s*\n\s*time\.sleep\([^)]+\)\s*\n\s*pyautogui\.mouseUp\([^)]+\)'
-                modified_script = re.sub(mouse_pattern, '', modified_script, count=3, flags=re.MULTILINE)
-                logger.debug("Skipped first ESC and early mouse actions")
-            
-            # Replace pyautogui calls with ok-dna methods AFTER skipping
-            modified_script = modified_script.replace('pyautogui.press', '_ok_press')
-            modified_script = modified_script.replace('pyautogui.sleep', '_ok_sleep')
-            modified_script = modified_script.replace('pyautogui.mouseDown', '_ok_mouse_down')
-            modified_script = modified_script.replace('pyautogui.mouseUp', '_ok_mouse_up')
-            modified_script = modified_script.replace('pyautogui.click', '_ok_click')
-            
-            # Track if we've seen the first W key press (PNG already checked after teleport)
-            first_w_pressed = False
-            esc_skip_count = 0  # Track ESC presses to skip first one
-            
-            # Define replacement functions that convert pyautogui to ok-dna methods
-            def _ok_press(key):
-                nonlocal first_w_pressed, esc_skip_count
-                # Skip the first ESC press - we already navigated
-                if key.lower() == 'esc':
-                    esc_skip_count += 1
-                    if esc_skip_count == 1:
-                        logger.debug("Skipping first ESC key (already navigated)")
-                        return
-                    else:
-                        logger.debug("Pressing ESC key")
-                        self.send_key("esc", down_time=0.1)
-                        self.sleep(0.01)
-                        return
-                
-                # Check for W key - PNG already checked after teleport
-                if key.lower() == 'w':
-                    if not first_w_pressed:
-                        # PNG already checked after teleport, hold W for 2 seconds
-                        first_w_pressed = True
-                        logger.debug("Holding W key for 2 seconds (first press after PNG check)")
-                        self.send_key_down("w")
-                        self.sleep(2.0)  # Hold for 2 seconds
-                        self.send_key_up("w")
-                    else:
-                        logger.debug("Pressing W key")
-                        self.send_key("w", down_time=0.1)
-                    # Check cancellation after each key press
-                    self.sleep(0.01)  # Small sleep to allow cancellation check
-                elif key.lower() == 'f':
-                    logger.debug("Pressing F key")
-                    self.send_key("f", down_time=0.1)
-                    self.sleep(0.01)  # Small sleep to allow cancellation check
-                elif key.lower() == 'a':
-                    logger.debug("Pressing A key")
-                    self.send_key("a", down_time=0.1)
-                    self.sleep(0.01)  # Small sleep to allow cancellation check
-                else:
-                    logger.debug(f"Pressing key: {key}")
-                    self.send_key(key, down_time=0.1)
-                    self.sleep(0.01)  # Small sleep to allow cancellation check
-            
-            def _ok_sleep(duration):
-                # Use self.sleep() which handles cancellation automatically
-                # For longer sleeps, break into smaller chunks to allow cancellation
-                # This ensures the stop button works properly
-                if duration > 0.1:
-                    elapsed = 0.0
-                    check_interval = 0.05  # Smaller interval for better cancellation responsiveness
-                    while elapsed < duration:
-                        self.sleep(check_interval)  # sleep() raises TaskDisabledException if disabled
-                        elapsed += check_interval
-                    # Sleep remaining time
-                    remaining = duration - elapsed
-                    if remaining > 0:
-                        self.sleep(remaining)
-                else:
-                    self.sleep(duration)  # sleep() raises TaskDisabledException if disabled
-            
-            def _ok_mouse_down(x, y):
-                # Press mouse down at coordinates (left button by default)
-                self.mouse_down(x=int(x), y=int(y), key="left")
-                self.sleep(0.01)  # Small sleep to allow cancellation check
-            
-            def _ok_mouse_up(x, y):
-                # Release mouse up (left button by default)
-                # Note: mouse_up doesn't need coordinates, but we keep the parameter for compatibility
-                self.mouse_up(key="left")
-                self.sleep(0.01)  # Small sleep to allow cancellation check
-            
-            def _ok_click(x, y):
-                # Click directly at coordinates
-                self.click(int(x), int(y))
-                self.sleep(0.01)  # Small sleep to allow cancellation check
-            
-            # Execute modified script in a controlled namespace
-            namespace = {
-                '_ok_press': _ok_press,
-                '_ok_sleep': _ok_sleep,
-                '_ok_mouse_down': _ok_mouse_down,
-                '_ok_mouse_up': _ok_mouse_up,
-                '_ok_click': _ok_click,
-                'time': time,
-            }
-            try:
-                exec(modified_script, namespace)
-                logger.info("Script execution completed")
-                return True
-            except TaskDisabledException:
-                logger.info("Script execution cancelled by user")
-                raise  # Re-raise to stop the entire task
-            
+            script = get_script_cache().get(script_path)
+        except (OSError, UnicodeDecodeError, ScriptError) as e:
+            logger.error(f"Cannot load script {script_path}: {e}")
+            return False, False
+        if script.skipped_to_first_w:
+            logger.debug("Skipped all actions before first W key press")
+        else:
+            logger.debug("Skipped first ESC and early mouse actions")
+
+        optimizer = self.route_optimizer(script) if self.config.get("Compress Routes", False) else None
+        actions = optimizer.next_route() if optimizer is not None else script.actions
+        logger.info(f"Executing script actions ({len(actions)})...")
+        try:
+            self.navigation_interpreter().run(actions)
+            logger.info("Script execution completed")
+            if optimizer is not None:
+                # Arrival checkpoint: the route only counts as good when fish.png shows up after it
+                arrived = self.wait_for_png(self.ROUTE_ARRIVAL_PNG, timeout=self.ROUTE_ARRIVAL_TIMEOUT)
+                optimizer.report(arrived)
+                logger.info(f"Route timings: {optimizer.summary()}")
+                return True, arrived
+            return True, None
         except TaskDisabledException:
-            # Re-raise TaskDisabledException to stop the entire task
+            logger.info("Script execution cancelled by user")
             raise
         except Exception as e:
             logger.error(f"Error executing script: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return False
+            return True, False
+
+    def route_optimizer(self, script) -> RouteOptimizer:
+        """Timing optimizer of a spot script, kept per script and recreated when the script changes"""
+        optimizer = self.route_optimizers.get(script.path)
+        if optimizer is None or optimizer.script.digest != script.digest:
+            path = os.path.join(self.ROUTE_FOLDER, Path(script.path).stem + ROUTE_EXTENSION)
+            optimizer = self.route_optimizers[script.path] = RouteOptimizer(script, path)
+        return optimizer
+
+    def navigation_interpreter(self) -> NavigationInterpreter:
+        """Interpreter running navigation actions with this task's inputs, sleeps and image waits"""
+        return NavigationInterpreter(self, wait_image=self.wait_for_image)
     
     def find_fish_and_interact(self, fish_png_path: str = "mod/fish/fish.png", timeout: float = 30.0):
         """Keep pressing W until fish.png is found, then press F, click, and press spacebar"""
         logger.info("Looking for fish.png while holding W...")
-        deadline = time.monotonic() + timeout
         
         # Load fish.png template
-        if not os.path.exists(fish_png_path):
-            logger.error(f"Fish PNG file not found: {fish_png_path}")
-            return False
-        
-        try:
-            pil_img = Image.open(fish_png_path)
-            img_array = np.array(pil_img)
-            template = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            logger.error(f"Failed to load fish.png template {fish_png_path}: {e}")
+        template = self.get_template(fish_png_path)
+        if template is None:
+            logger.error(f"Fish PNG template not available: {fish_png_path}")
             return False
         
         # Hold W key down continuously
@@ -541,31 +515,26 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info("Holding W key down...")
         
         try:
-            # Keep checking for fish.png while W is held down
-            while time.monotonic() < deadline:
-                # Check for fish.png
-                box = self.find_image_template(template, threshold=0.7)
-                if box:
-                    logger.info("Found fish.png!")
-                    self.send_key_up("w")  # Stop pressing W
-                    self.sleep(0.5)  # Small delay
-                    
-                    # Press F on the fish
-                    logger.info("Pressing F on fish...")
-                    self.send_key("f", down_time=0.1)
-                    self.sleep(1.0)
-                    
-                    # Click on (1760, 950)
-                    logger.info("Clicking at (1760, 950)...")
-                    self.click(1760, 950)
-                    self.sleep(1.0)
-                    
-                    # Don't press spacebar - AutoFishTask will handle it
-                    
-                    return True
+            # Keep checking for fish.png on every new frame while W is held down
+            result = self.wait_until_any({"fish": lambda: self.find_image_template(template, threshold=0.7)}, timeout)
+            if result:
+                logger.info(f"Found fish.png! ({result.elapsed:.2f}s)")
+                self.send_key_up("w")  # Stop pressing W
+                self.sleep(0.5)  # Small delay
+                
+                # Press F on the fish
+                logger.info("Pressing F on fish...")
+                self.send_key("f", down_time=0.1)
+                self.sleep(1.0)
+                
+                # Click on (1760, 950)
+                logger.info("Clicking at (1760, 950)...")
+                self.click(1760, 950)
+                self.sleep(1.0)
+                
+                # Don't press spacebar - AutoFishTask will handle it
                 
-                self.sleep(0.2)  # Check every 0.2 seconds
-                self.next_frame()
+                return True
         finally:
             # Make sure W key is released even if we timeout or error
             self.send_key_up("w")
@@ -575,28 +544,19 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         return False
     
     def exit_fishing_menu(self):
-        """Exit fishing menu by pressing ESC twice with delay"""
+        """Exit fishing menu by pressing ESC twice, waiting for the screen to settle (up to 1s) after each"""
         logger.info("Exiting fishing menu (ESC x2)...")
         self.send_key("esc", down_time=0.1)
-        self.sleep(1.0)
+        self.wait_screen_settled(1.0)
         self.send_key("esc", down_time=0.1)
-        self.sleep(1.0)
+        self.wait_screen_settled(1.0)
     
     def detect_no_more_fish(self, quick_check: bool = False) -> bool:
         """Detect if 'no more fish' image appears on screen using image matching"""
-        no_fish_png_path = "mod/fish/nomorefish.png"
-        
-        if not os.path.exists(no_fish_png_path):
-            logger.debug(f"No more fish PNG file not found: {no_fish_png_path}")
-            return False
-        
-        # Load nomorefish.png template
-        try:
-            pil_img = Image.open(no_fish_png_path)
-            img_array = np.array(pil_img)
-            template = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            logger.error(f"Failed to load nomorefish.png template {no_fish_png_path}: {e}")
+        # nomorefish.png is preloaded by the template bank, no disk access on the hot path
+        template = self.get_template("mod/fish/nomorefish.png")
+        if template is None:
+            logger.debug("No more fish template not available: mod/fish/nomorefish.png")
             return False
         
         if quick_check:
@@ -608,19 +568,14 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             return False
         
         # Full check with timeout
-        cfg = self.config
-        timeout = cfg.get("No Fish Timeout", 10.0)
-        deadline = time.monotonic() + timeout
+        timeout = self.config.get("No Fish Timeout", 10.0)
         
         logger.info("Checking for 'no more fish' image...")
-        while time.monotonic() < deadline:
-            box = self.find_image_template(template, threshold=0.7)
-            if box:
-                logger.info("Detected 'no more fish' image")
-                return True
-            
-            self.sleep(0.5)
-            self.next_frame()
+        result = self.wait_until_any({"no_more_fish": lambda: self.find_image_template(template, threshold=0.7)},
+                                     timeout)
+        if result:
+            logger.info("Detected 'no more fish' image")
+            return True
         
         logger.debug("No 'no more fish' image detected")
         return False
@@ -635,6 +590,7 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         """查找 fish_cast 图标（抛竿/收杆），返回 (found, center)"""
         CAST_THRESHOLD = 0.8  # fish_cast 匹配阈值
         fish_box = self.box_of_screen_scaled(3840, 2160, 3147, 1566, 3383, 1797, name="fish_bite")
+        self.record_frame("bite")
         box = self.find_one("fish_cast", box=fish_box, threshold=CAST_THRESHOLD) or self.find_one("fish_ease",
                                                                                                   box=fish_box,
                                                                                                   threshold=CAST_THRESHOLD)
@@ -648,6 +604,7 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         fish_box = self.box_of_screen_scaled(
             3840, 2160, 3147, 1566, 3383, 1797, name="fish_bite"
         )
+        self.record_frame("bite")
         box = self.find_one("fish_bite", box=fish_box, threshold=BITE_THRESHOLD)
         if box:
             return True, (box.x + box.width // 2, box.y + box.height // 2)
@@ -657,90 +614,206 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         """查找 fish_chance 图标（授渔以鱼），返回 (found, center)"""
         CHANCE_THRESHOLD = 0.8  # fish_chance 匹配阈值
         fish_chance_box = self.box_of_screen_scaled(3840, 2160, 3467, 1797, 3703, 2033, name="fish_chance")
+        self.record_frame("chance")
         box = self.find_one("fish_chance", box=fish_chance_box, threshold=CHANCE_THRESHOLD)
         if box:
             return True, (box.x + box.width // 2, box.y + box.height // 2)
         return False, (0, 0)
     
-    def find_bar_and_fish_by_area(self):
+    def hud_detector(self):
+        """Fused HUD icon detector, None when its templates cannot be loaded"""
+        if self._hud_detector is None:
+            try:
+                self._hud_detector = HudDetector.from_annotations(threshold=self.HUD_THRESHOLD)
+            except Exception as e:
+                logger.warning(f"Fused HUD detector unavailable, using per icon detection: {e}")
+                self._hud_detector = False
+        return self._hud_detector or None
+
+    def read_hud(self, icons=None) -> HudReading:
+        """Cast/bite/chance icons of the current frame, computed once per frame
+
+        icons limits the detection to some of "cast", "bite" and "chance"
+        (e.g. only the bite icon while waiting for a bite); the others count
+        as absent.
+        """
+        icons = tuple(self.HUD_ICONS) if icons is None else tuple(icons)
+        frame = self.frame
+        if frame is not None and self._hud_reading[0] is frame and self._hud_reading[1] == icons:
+            return self._hud_reading[2]
+        detector = self.hud_detector() if self.config.get("Fused HUD Detector", False) else None
+        if detector is not None and frame is not None:
+            if "cast" in icons or "bite" in icons:
+                self.record_frame("bite", frame)
+            if "chance" in icons:
+                self.record_frame("chance", frame)
+            reading = detector.detect(frame, [name for icon in icons for name in self.HUD_ICONS[icon]])
+        else:
+            has_cast_icon = "cast" in icons and self.find_fish_cast()[0]
+            has_bite_icon = "bite" in icons and self.find_fish_bite()[0]
+            has_chance_icon = "chance" in icons and self.find_fish_chance()[0]
+            if has_chance_icon:
+                state = HudState.CHANCE
+            elif has_bite_icon:
+                state = HudState.BITE
+            elif has_cast_icon:
+                state = HudState.CAST
+            else:
+                state = HudState.NONE
+            reading = HudReading(state, has_cast_icon, has_bite_icon, has_chance_icon, {}, {})
+        self._hud_reading = (frame, icons, reading)
+        return reading
+
+    def fish_bar_detector(self) -> FishBarDetector:
+        """Detector selected by the "Fish Bar Detector" config, rebuilt when the setting changes"""
+        method = str(self.config.get("Fish Bar Detector", "Contours")).lower()
+        if method not in DETECTOR_METHODS:
+            method = "contours"
+        detector = getattr(self, "_fish_bar_detector", None)
+        if detector is None or detector.method != method:
+            detector = FishBarDetector(method, self.BAR_MIN_AREA, self.ICON_MIN_AREA, self.ICON_MAX_AREA)
+            self._fish_bar_detector = detector
+            self.log_info(f"fish bar detector: {method}")
+        return detector
+
+    def report_fight_latency(self):
+        """Show fight loop latency percentiles (ms) and optionally dump the ring buffer"""
+        telemetry = self.fight_latency
+        if not len(telemetry):
+            return
+        summary = telemetry.summary()
+        self.info_set("Fight Frame Age p50/95/99 (ms)", summary["frame_age"])
+        self.info_set("Fight Detect p50/95/99 (ms)", summary["detect"])
+        self.info_set("Fight Input p50/95/99 (ms)", summary["input"])
+        self.info_set("Fight Loop p50/95/99 (ms)", summary["loop"])
+        self.info_set("Fight Loop Rate (Hz)", summary.get("rate", "-"))
+        if self.config.get("Dump Fight Latency", False):
+            try:
+                path = telemetry.dump(self.FIGHT_LATENCY_DUMP)
+                logger.debug(f"fight latency dumped to {path}")
+            except OSError as e:
+                logger.error(f"fight latency dump failed: {e}")
+
+    def start_session_recording(self, spot_name: str = ""):
+        """Start recording ROI frames and inputs when "Record Sessions" is enabled"""
+        self.session_recorder = None
+        if not self.config.get("Record Sessions", False):
+            return
+        self.session_name = f"{spot_name or 'fishing'}_{time.strftime('%Y%m%d_%H%M%S')}"
+        self.session_part = 0
+        logger.info(f"Recording fishing sessions to {self.SESSION_FOLDER}/{self.session_name}_*")
+        self.open_session_part()
+
+    def open_session_part(self):
+        """Start the next session file (one per round)"""
+        self.session_part += 1
+        path = os.path.join(self.SESSION_FOLDER, f"{self.session_name}_{self.session_part:04d}{SESSION_EXTENSION}")
+        try:
+            self.session_recorder = SessionRecorder(path)
+        except OSError as e:
+            logger.error(f"session recording disabled: {e}")
+            self.session_recorder = None
+
+    def flush_session_recording(self, reopen: bool = True):
+        """Finish the current session file if anything was recorded (one round) and start the next one"""
+        recorder = getattr(self, "session_recorder", None)
+        if recorder is None or (reopen and not len(recorder)):
+            return
+        try:
+            recorder.close()
+            if len(recorder):
+                written = os.path.getsize(recorder.path)
+                logger.debug(f"session saved: {recorder.path} ({len(recorder)} frames, {len(recorder.inputs)} inputs, "
+                             f"{recorder.bytes_raw / 1024:.0f} KiB raw -> {written / 1024:.0f} KiB)")
+            else:
+                os.remove(recorder.path)
+        except OSError as e:
+            logger.error(f"session save failed: {e}")
+        self.session_recorder = None
+        if reopen:
+            self.open_session_part()
+
+    def record_frame(self, region: str, frame=None):
+        """Add the given registered ROI of the current frame to the session recording"""
+        recorder = getattr(self, "session_recorder", None)
+        if recorder is not None:
+            recorder.add_frame(self.frame if frame is None else frame, (region,))
+
+    def send_key(self, key, *args, **kwargs):
+        recorder = getattr(self, "session_recorder", None)
+        if recorder is not None:
+            recorder.add_input("key", key, kwargs.get("down_time"))
+        return super().send_key(key, *args, **kwargs)
+
+    def send_key_down(self, key, *args, **kwargs):
+        recorder = getattr(self, "session_recorder", None)
+        if recorder is not None:
+            recorder.add_input("key_down", key)
+        return super().send_key_down(key, *args, **kwargs)
+
+    def send_key_up(self, key, *args, **kwargs):
+        recorder = getattr(self, "session_recorder", None)
+        if recorder is not None:
+            recorder.add_input("key_up", key)
+        return super().send_key_up(key, *args, **kwargs)
+
+    def fight_controller(self) -> FightController:
+        """Controller selected by the "Fight Controller" config"""
+        name = str(self.config.get("Fight Controller", "Bang-Bang")).lower()
+        if name not in CONTROLLERS:
+            name = "bang-bang"
+        if name == "predictive":
+            latency = float(self.config.get("Predictive Latency (ms)", 60)) / 1000
+            return create_controller(name, merge_grace=self.MERGE_GRACE_SECONDS, latency=latency)
+        return create_controller(name, merge_grace=self.MERGE_GRACE_SECONDS)
+
+    def fish_roi(self, frame=None):
+        """(box, (x, y, w, h), res_ratio) of the fish bar ROI, computed once per frame size"""
+        shape = (self.frame if frame is None else frame).shape[:2]
+        cached = getattr(self, "_fish_roi_cache", None)
+        if cached is None or cached[0] != shape:
+            box = self.box_of_screen_scaled(1920, 1080, 1620, 325, 1645, 725, name="fish_roi")
+            cached = (shape, (box, (box.x, box.y, box.width, box.height), shape[0] / 1080))
+            self._fish_roi_cache = cached
+        return cached[1]
+
+    def start_fight_pipeline(self) -> DetectionPipeline:
+        """Worker thread that waits for each new frame and runs the fish bar detector on it
+
+        While the pipeline runs, only the worker captures (next_frame / self.frame) and uses the fish ROI cache
+        and the detector buffers; the fight loop just sends keys and must stop() the pipeline (which waits up to 2 s
+        for the worker to exit) before capturing again. The session recorder is locked, and CONTROL_ZONE_RATIO is a single
+        float attribute written by the worker and read by the loop.
+        """
+        def grab():
+            self.next_frame()
+            return self.frame
+
+        return DetectionPipeline(grab, self.find_bar_and_fish_by_area).start()
+
+    def find_bar_and_fish_by_area(self, frame=None):
         """基于 ROI 找到鱼条和鱼标的区域与面积
 
         返回：((has_bar, bar_center, bar_rect), (has_icon, icon_center, icon_rect))
         注意：bar_center 和 icon_center 是相对于 ROI 内部的坐标，bar_rect 和 icon_rect 也是
+        frame 默认为当前帧（流水线模式下由工作线程传入）
         """
-        # 获取 ROI 区域
-        box = self.box_of_screen_scaled(1920, 1080, 1620, 325, 1645, 725, name="fish_roi")
-
         try:
-            frame_height, _ = self.frame.shape[:2]
-            res_ratio = frame_height / 1080
-            roi_img = box.crop_frame(self.frame)
-
-            # 转换为灰度图
-            gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-
-            # 二值化：提取亮色区域（鱼条和图标都是白色/亮色）
-            _, scene_bin = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
-
-            # 查找轮廓
-            contours, _ = cv2.findContours(scene_bin, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-
-            # 收集所有符合最小面积的轮廓
-            blobs = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > self.ICON_MIN_AREA * res_ratio ** 2:
-                    blobs.append({"contour": contour, "area": area})
-
-            # 按面积降序排列
-            blobs.sort(key=lambda b: b["area"], reverse=True)
-
-            has_bar = has_icon = False
-            bar_center = bar_rect = icon_center = icon_rect = None
-            bar_area = icon_area = 0.0
-
-            # 查找鱼条（最大的符合条件的轮廓）
-            for blob in blobs:
-                if blob["area"] > self.BAR_MIN_AREA * res_ratio ** 2:
-                    contour = blob["contour"]
-                    moments = cv2.moments(contour)
-                    if moments["m00"] > 0:
-                        has_bar = True
-                        bar_area = blob["area"]
-                        bar_center = (
-                            int(moments["m10"] / moments["m00"]),
-                            int(moments["m01"] / moments["m00"]),
-                        )
-                        x, y, w, h = cv2.boundingRect(contour)
-                        bar_rect = (x, y, x + w, y + h)
-                    break
-
-            # 查找鱼标（第二大的符合条件的轮廓，排除鱼条）
-            for blob in blobs:
-                if blob["area"] == bar_area:
-                    continue
-                if self.ICON_MIN_AREA * res_ratio ** 2 < blob["area"] < self.ICON_MAX_AREA * res_ratio ** 2:
-                    contour = blob["contour"]
-                    moments = cv2.moments(contour)
-                    if moments["m00"] > 0:
-                        has_icon = True
-                        icon_area = blob["area"]
-                        icon_center = (
-                            int(moments["m10"] / moments["m00"]),
-                            int(moments["m01"] / moments["m00"]),
-                        )
-                        x, y, w, h = cv2.boundingRect(contour)
-                        icon_rect = (x, y, x + w, y + h)
-                    break
+            if frame is None:
+                frame = self.frame
+            self.record_frame("fish", frame)
+            # ROI 与分辨率比例按帧尺寸缓存，灰度/二值图写入检测器预分配的缓冲区
+            box, roi, res_ratio = self.fish_roi(frame)
+            bar, icon, bar_area = self.fish_bar_detector().detect_frame(frame, roi, res_ratio)
 
-            if has_bar:
+            if bar[0]:
                 zone_ratio = bar_area / box.area()
                 if self.CONTROL_ZONE_RATIO <= 0 or abs(
                         zone_ratio - self.CONTROL_ZONE_RATIO) / self.CONTROL_ZONE_RATIO > 0.1:
                     self.CONTROL_ZONE_RATIO = zone_ratio
                     self.log_info(f"set CONTROL_ZONE_RATIO {self.CONTROL_ZONE_RATIO}")
 
-            return (has_bar, bar_center, bar_rect), (has_icon, icon_center, icon_rect)
+            return bar, icon
         except TaskDisabledException:
             raise
         except Exception as e:
@@ -753,13 +826,16 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         self.fishing_stats["current_phase"] = "Casting"
         self.info_set("Current Phase", "Casting")
 
-        start_deadline = time.monotonic() + cfg.get("MAX_START_SEC", 20.0)
+        start_deadline = time.monotonic() + self.phase_timeout("start", "MAX_START_SEC", 20.0)
 
-        has_cast_icon, _ = self.find_fish_cast()
+        hud = self.read_hud()
+        has_cast_icon = hud.cast
         self.fishing_stats["last_cast_icon_found"] = has_cast_icon
+        self.fishing_stats["last_hud_scores"] = hud.scores
+        logger.debug(f"HUD {hud.state.name}: {', '.join(f'{k}={v:.2f}' for k, v in hud.scores.items())}")
 
         # Check for chance opportunity
-        has_chance_icon, _ = self.find_fish_chance()
+        has_chance_icon = hud.chance
         if has_chance_icon:
             logger.info("Detected fish_chance (Chance Used) -> Press E key to use chance cast")
             self.fishing_stats["chance_used"] = self.fishing_stats.get("chance_used", 0) + 1
@@ -785,7 +861,8 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             raise Exception("No more fish available")
 
         logger.info("Waiting for fish_bite to appear...")
-        ret = self.wait_until(lambda: self.find_fish_bite()[0], time_out=start_deadline, raise_if_not_found=False)
+        ret = self.wait_until(lambda: self.read_hud(("bite",)).bite, time_out=start_deadline - time.monotonic(),
+                              raise_if_not_found=False)
         self.fishing_stats["last_bite_icon_found"] = ret
         if ret:
             logger.info("Found fish_bite -> Waiting for fish to bite")
@@ -793,11 +870,15 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             logger.info("Timeout: Waiting for fish_bite to appear")
             return False
 
+        detector = self.hud_detector() if cfg.get("Fused HUD Detector", False) else None
+        if cfg.get("Fast Bite Reaction", False) and detector is not None:
+            return self.react_to_bite(detector, start_deadline)
+
         # Wait for fish_bite to disappear (fish bit the hook)
-        logger.info("Waiting for fish to bite...")
-        bite_gone_stable_time = 0.5
-        ret = self.wait_until(lambda: not self.find_fish_bite()[0], time_out=start_deadline,
-                              settle_time=bite_gone_stable_time)
+        bite_gone_stable_time = cfg.get("Bite Settle Time", 0.5)
+        logger.info(f"Waiting for fish to bite (settle time {bite_gone_stable_time}s)...")
+        ret = self.wait_until(lambda: not self.read_hud(("bite",)).bite, time_out=start_deadline - time.monotonic(),
+                              settle_time=bite_gone_stable_time, raise_if_not_found=False)
         self.fishing_stats["last_bite_icon_found"] = not ret
         if not ret:
             logger.info("Timeout waiting for fish_bite to disappear")
@@ -805,7 +886,8 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
 
         # Wait for fish_cast to appear (reel prompt)
         logger.info("Waiting for fish_cast to appear (reel prompt)...")
-        ret = self.wait_until(lambda: self.find_fish_cast()[0], time_out=start_deadline)
+        ret = self.wait_until(lambda: self.read_hud(("cast",)).cast, time_out=start_deadline - time.monotonic(),
+                              raise_if_not_found=False)
         self.fishing_stats["last_cast_icon_found"] = ret
         if ret:
             logger.info("Found fish_cast -> Press space to reel, entering fighting phase")
@@ -815,6 +897,40 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info("Timeout: Waiting for fish_cast to appear")
         return False
 
+    def react_to_bite(self, detector: HudDetector, start_deadline: float) -> bool:
+        """Bite fast path: score only the bite slot on every new frame and reel on the confirmed prompt
+
+        Replaces the settle wait + separate reel prompt wait: space is pressed as
+        soon as fish_cast / fish_ease shows on BITE_CONFIRM_FRAMES consecutive
+        frames after fish_bite went away (fish_bite coming back starts over).
+        """
+        logger.info(f"Waiting for fish to bite (fast reaction, prompt confirmed on {self.BITE_CONFIRM_FRAMES} frames)...")
+        bite_gone_at = None
+        confirmed = 0
+        while time.monotonic() < start_deadline:
+            frame = self.frame
+            self.record_frame("bite", frame)
+            hud = detector.detect(frame, BITE_SLOT_ICONS)
+            if hud.bite:
+                bite_gone_at, confirmed = None, 0
+            else:
+                if bite_gone_at is None:
+                    bite_gone_at = time.perf_counter()
+                confirmed = confirmed + 1 if hud.cast else 0
+                if confirmed >= self.BITE_CONFIRM_FRAMES:
+                    reaction = time.perf_counter() - bite_gone_at
+                    self.send_key("space", down_time=0.06)
+                    self.fishing_stats["last_bite_icon_found"] = False
+                    self.fishing_stats["last_cast_icon_found"] = True
+                    self.fishing_stats["last_bite_reaction"] = reaction
+                    logger.info(f"Reel prompt confirmed {reaction * 1000:.0f} ms after fish_bite disappeared "
+                                f"-> Press space, entering fighting phase")
+                    return True
+            self.next_frame()
+        self.fishing_stats["last_bite_icon_found"] = bite_gone_at is None
+        logger.info("Timeout: Waiting for fish to bite (fast reaction)")
+        return False
+
     def phase_fight(self) -> bool:
         """Fighting phase: control the fishing bar"""
         cfg = self.config
@@ -823,25 +939,32 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info("Entering fighting phase...")
 
         BAR_MISSING_TIMEOUT = 2.5
-        MERGE_GRACE_SECONDS = 0.20
-        fight_deadline = time.monotonic() + cfg.get("MAX_FIGHT_SEC", 60.0)
+        fight_deadline = time.monotonic() + self.phase_timeout("fight", "MAX_FIGHT_SEC", 60.0)
 
         is_holding_space = False
-        icon_was_visible_prev = False
-        last_known_icon_y_relative = 0.0
-
         bar_missing_start_time = None
-        merge_start_time = None
+        controller = self.fight_controller()
+        controller.reset()
+
+        telemetry = self.fight_latency
+        frame_ready = time.perf_counter()
+        loop_start = None
+        # 流水线模式：工作线程取帧并检测，控制循环只消费最新的检测结果
+        pipeline = self.start_fight_pipeline() if cfg.get("Pipelined Fight", False) else None
 
-        def set_hold(target_hold: bool):
+        def set_hold(target_hold: bool) -> float:
+            """切换空格状态，返回从决策到按键发出的耗时（未发送为 NaN）"""
             nonlocal is_holding_space
-            if target_hold != is_holding_space:
-                if target_hold:
-                    self.send_key_down("space")
-                else:
-                    self.send_key_up("space")
-                is_holding_space = target_hold
-                self.fishing_stats["last_hold_state"] = is_holding_space
+            if target_hold == is_holding_space:
+                return float("nan")
+            decided = time.perf_counter()
+            if target_hold:
+                self.send_key_down("space")
+            else:
+                self.send_key_up("space")
+            is_holding_space = target_hold
+            self.fishing_stats["last_hold_state"] = is_holding_space
+            return time.perf_counter() - decided
 
         try:
             while True:
@@ -850,10 +973,18 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                     logger.info("Fighting timeout")
                     return False
 
-                (has_bar, bar_center, bar_rect), (has_icon, icon_center, icon_rect) = self.find_bar_and_fish_by_area()
-
-                if has_bar and has_icon:
-                    last_known_icon_y_relative = icon_center[1] - bar_center[1]
+                if pipeline is None:
+                    detect_start = time.perf_counter()
+                    result = self.find_bar_and_fish_by_area()
+                    detect_time = time.perf_counter() - detect_start
+                    observed = now
+                else:
+                    detection = pipeline.latest(timeout=0.5)
+                    if detection is None:
+                        continue
+                    result, detect_start, detect_time = detection.result, detection.detect_start, detection.detect_time
+                    frame_ready = observed = detection.frame_time
+                (has_bar, bar_center, bar_rect), (has_icon, icon_center, icon_rect) = result
 
                 if not has_bar:
                     if bar_missing_start_time is None:
@@ -864,53 +995,31 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                 else:
                     bar_missing_start_time = None
 
-                if has_bar and bar_rect:
-                    bar_top = bar_rect[1]
-                    bar_bottom = bar_rect[3]
-                    bar_height = bar_bottom - bar_top
-
-                    if bar_height <= 0:
-                        bar_height = 1
-
-                    control_zone_ratio = self.CONTROL_ZONE_RATIO
-                    control_height = int(bar_height * control_zone_ratio)
-                    control_top = bar_top + control_height
-                    control_bottom = bar_bottom - control_height
-
-                    is_merged = has_bar and (not has_icon) and icon_was_visible_prev
+                # 控制器决定按住/松开空格（None = 保持当前状态）
+                hold = controller.decide(FightObservation(observed, has_bar, bar_center, bar_rect, has_icon, icon_center,
+                                                          self.CONTROL_ZONE_RATIO))
+                decided = time.perf_counter()
+                input_time = set_hold(hold) if hold is not None else float("nan")
+                if controller.last_merge_event:
+                    self.fishing_stats["last_merge_event"] = controller.last_merge_event
 
-                    if has_icon:
-                        merge_start_time = None
-                        icon_y = icon_center[1]
-
-                        if icon_y < control_top:
-                            set_hold(True)
-                        elif icon_y > control_bottom:
-                            set_hold(False)
-                    else:
-                        if is_merged:
-                            if merge_start_time is None:
-                                merge_start_time = now
-                                self.fishing_stats["last_merge_event"] = (f"merged, last_rel={last_known_icon_y_relative:.1f}")
-                            elapsed = now - merge_start_time
-                            if elapsed <= MERGE_GRACE_SECONDS:
-                                if last_known_icon_y_relative < 0:
-                                    set_hold(True)
-                                else:
-                                    set_hold(False)
-                        else:
-                            merge_start_time = None
-                else:
-                    set_hold(False)
-
-                icon_was_visible_prev = has_icon
-                self.next_frame()
+                # 帧龄 = 决策时刻距离拿到该帧的时间；loop = 相邻两次迭代的间隔
+                loop_time = detect_start - loop_start if loop_start is not None else float("nan")
+                telemetry.record(decided - frame_ready, detect_time, input_time, loop_time)
+                loop_start = detect_start
+                if pipeline is None:
+                    self.next_frame()
+                    frame_ready = time.perf_counter()
 
         except TaskDisabledException:
             self.send_key_up("space")
             raise
         finally:
+            if pipeline is not None:
+                pipeline.stop()
+                logger.debug(f"fight pipeline: {pipeline.produced} detections, {pipeline.dropped} dropped as stale")
             self.send_key_up("space")
+            self.report_fight_latency()
 
     def phase_end(self) -> bool:
         """End phase: collect fish and return to casting"""
@@ -925,15 +1034,13 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info("Reeling (Space)")
         self.send_key("space", down_time=0.06)
 
-        confirm_deadline = time.monotonic() + cfg.get("MAX_END_SEC", 20.0)
+        confirm_deadline = time.monotonic() + self.phase_timeout("end", "MAX_END_SEC", 20.0)
         while time.monotonic() < confirm_deadline:
-            has_cast_icon, _ = self.find_fish_cast()
-            has_bite_icon, _ = self.find_fish_bite()
-            has_chance_icon, _ = self.find_fish_chance()
-            self.fishing_stats["last_cast_icon_found"] = has_cast_icon
-            self.fishing_stats["last_bite_icon_found"] = has_bite_icon
-            if has_cast_icon or has_bite_icon or has_chance_icon:
-                if has_chance_icon:
+            hud = self.read_hud()
+            self.fishing_stats["last_cast_icon_found"] = hud.cast
+            self.fishing_stats["last_bite_icon_found"] = hud.bite
+            if hud.state is not HudState.NONE:
+                if hud.chance:
                     logger.info("Confirmed returned to casting interface (detected chance used)")
                 else:
                     logger.info("Confirmed returned to casting interface")
@@ -943,9 +1050,57 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
         logger.info("End phase confirmation failed")
         return False
     
-    def run_fishing_loop(self, max_rounds: int = 0, initial_total: int = 0):
+    def phase_timeout(self, phase: str, config_key: str, default: float) -> float:
+        """Timeout of a phase: learned from recent rounds at the current spot, capped by the config value"""
+        cap = self.config.get(config_key, default)
+        if not self.config.get("Adaptive Timeouts", True):
+            return cap
+        timeout = self.phase_timeouts.timeout(self.current_spot_name, phase, cap)
+        if timeout < cap:
+            logger.debug(f"{phase} phase timeout {timeout:.1f}s (learned, {config_key} = {cap}s)")
+        return timeout
+
+    def save_phase_durations(self, force: bool = False):
+        """Write the phase durations at most every PHASE_DURATIONS_SAVE_INTERVAL seconds (force: now)"""
+        now = time.monotonic()
+        if not force and now - self._phase_durations_saved < self.PHASE_DURATIONS_SAVE_INTERVAL:
+            return
+        self._phase_durations_saved = now
+        try:
+            self.phase_timeouts.save(self.PHASE_DURATIONS_FILE)
+        except OSError as e:
+            logger.warning(f"Cannot save phase durations: {e}")
+
+    def ledger_append(self, kind: str, **fields):
+        """Queue a ledger record (written in the background)"""
+        if not self.config.get("Session Ledger", True):
+            return
+        if self.ledger is None:
+            self.ledger = SessionLedger(self.LEDGER_FILE)
+        self.ledger.append(kind, **fields)
+
+    def close_ledger(self):
+        if self.ledger is not None:
+            self.ledger.close()
+            logger.debug(f"ledger: {self.ledger.written} records written to {self.LEDGER_FILE}")
+            self.ledger = None
+
+    def ledger_round(self, spot_name: str, outcome: str, phases: dict, chance_before: int):
+        """One ledger record for the round that just ended (successfully or not)"""
+        stats = self.fishing_stats
+        reaction = stats.pop("last_bite_reaction", None)
+        fight = "ended" if "fight" in phases else ("timeout" if outcome == FIGHT_TIMEOUT else None)
+        self.ledger_append(ROUND, spot=spot_name, outcome=outcome,
+                           phases={phase: round(seconds, 3) for phase, seconds in phases.items()},
+                           chance=stats.get("chance_used", 0) > chance_before, fight=fight,
+                           scores={icon: round(score, 3) for icon, score in stats.pop("last_hud_scores", {}).items()} or None,
+                           bite_reaction=None if reaction is None else round(reaction, 3))
+
+    def run_fishing_loop(self, max_rounds: int = 0, initial_total: int = 0, spot_name: str = ""):
         """Run the fishing loop for current spot"""
         cfg = self.config
+        self.current_spot_name = spot_name
+        self.start_session_recording(spot_name)
         
         # Initialize fishing stats for this spot
         self.fishing_stats = {
@@ -963,7 +1118,11 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             self.info_set("Target Rounds", max_rounds)
 
         while True:
+            phases = {}
+            chance_before = self.fishing_stats.get("chance_used", 0)
             try:
+                # 上一回合的录制写入单独的会话文件
+                self.flush_session_recording()
                 if max_rounds > 0 and self.fishing_stats["rounds_completed"] >= max_rounds:
                     has_chance_icon, _ = self.find_fish_chance()
                     if has_chance_icon:
@@ -985,15 +1144,33 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                             self.soundBeep()
                         break
 
+                # 阶段耗时用于自适应超时（超时的阶段记为截尾样本）；每回合（含失败）写一条账本记录
+                phase_started = time.monotonic()
                 if not self.phase_start():
+                    self.phase_timeouts.record(spot_name, "start", time.monotonic() - phase_started, censored=True)
+                    self.ledger_round(spot_name, START_TIMEOUT, phases, chance_before)
                     self.sleep(1.0)
                     continue
+                phases["start"] = time.monotonic() - phase_started
+                self.phase_timeouts.record(spot_name, "start", phases["start"])
+                phase_started = time.monotonic()
                 if not self.phase_fight():
+                    self.phase_timeouts.record(spot_name, "fight", time.monotonic() - phase_started, censored=True)
+                    self.ledger_round(spot_name, FIGHT_TIMEOUT, phases, chance_before)
                     self.sleep(1.0)
                     continue
+                phases["fight"] = time.monotonic() - phase_started
+                self.phase_timeouts.record(spot_name, "fight", phases["fight"])
+                phase_started = time.monotonic()
                 if not self.phase_end():
+                    self.phase_timeouts.record(spot_name, "end", time.monotonic() - phase_started, censored=True)
+                    self.ledger_round(spot_name, END_FAILED, phases, chance_before)
                     self.sleep(1.0)
                     continue
+                phases["end"] = time.monotonic() - phase_started
+                self.phase_timeouts.record(spot_name, "end", phases["end"])
+                self.save_phase_durations()
+                self.ledger_round(spot_name, CAUGHT, phases, chance_before)
 
                 # Complete one round
                 self.fishing_stats["rounds_completed"] += 1
@@ -1023,6 +1200,7 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                 self.sleep(1.0)
                 self.sleep(1.0)
             except TaskDisabledException:
+                self.flush_session_recording(reopen=False)
                 # Preserve stats before re-raising
                 if hasattr(self, 'fishing_stats'):
                     self.info_set("Rounds Completed", self.fishing_stats.get("rounds_completed", 0))
@@ -1033,10 +1211,13 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
             except Exception as e:
                 if "No more fish available" in str(e):
                     logger.info("No more fish available - stopping fishing")
+                    self.ledger_round(spot_name, NO_MORE_FISH, phases, chance_before)
                     break
                 logger.error(f"Fishing loop error: {e}")
                 break
         
+        self.flush_session_recording(reopen=False)
+
         # Final stats update before returning
         if hasattr(self, 'fishing_stats'):
             final_rounds = self.fishing_stats.get("rounds_completed", 0)
@@ -1105,12 +1286,24 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                 self.info_set("Fish Caught (Current Spot)", 0)
                 
                 # Step 1: Navigate menu to fishing spot teleport (5 sec wait for Sewers, 25 sec for others)
-                self.navigate_to_fishing_spot(spot_name, e_count)
+                navigation_started = time.monotonic()
+                arrived = self.navigate_to_fishing_spot(spot_name, e_count)
+                
+                # Step 1.2: Recorded route from the teleport to the fish (mod/fish/<spot>.py with "Spot Routes"),
+                # replaces the built-in movement; the fish.png search below still runs and walks the rest of the
+                # way if needed
+                route_executed = False
+                if arrived and cfg.get("Spot Routes", False) and os.path.exists(script_path):
+                    self.info_set("Status", f"Running {spot_name} route")
+                    route_executed, route_arrived = self.execute_spot_script(script_path, png_path)
+                    if route_executed and route_arrived is False:
+                        logger.warning(f"{spot_name} route did not reach fish.png, searching from where it ended")
                 
                 # Step 1.5: Sewers-specific - look for fish.png and interact (no W needed, already waited 5 sec in navigate)
                 if spot_name == "Sewers":
                     logger.info("Sewers: Looking for fish.png (up to 1 minute)...")
-                    if self.wait_for_png("mod/fish/fish.png", timeout=60.0):
+                    found_fish = self.wait_for_png("mod/fish/fish.png", timeout=60.0)
+                    if found_fish:
                         logger.info("Found fish.png, pressing F and clicking to enter fishing mode")
                         # Press F on the fish
                         self.send_key("f", down_time=0.1)
@@ -1122,7 +1315,7 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                         logger.warning("fish.png not found after 1 minute, continuing anyway...")
                 else:
                     # Step 2: Icelake-specific movement - tap 'a' twice
-                    if spot_name == "Icelake":
+                    if spot_name == "Icelake" and not route_executed:
                         logger.info("Icelake: Waiting for map to stabilize, then tapping 'a' twice...")
                         self.sleep(1.0)  # Wait for map to fully load
                         self.next_frame()  # Update frame
@@ -1137,7 +1330,9 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                 # Step 4: Hold W and find fish.png, then interact (for Purgatorio and Icelake, skip for Sewers)
                 if spot_name != "Sewers":
                     logger.info("Step 4: Looking for fish.png while holding W...")
-                    self.find_fish_and_interact(fish_png_path="mod/fish/fish.png", timeout=30.0)
+                    found_fish = self.find_fish_and_interact(fish_png_path="mod/fish/fish.png", timeout=30.0)
+                self.ledger_append(NAVIGATION, spot=spot_name, duration=round(time.monotonic() - navigation_started, 3),
+                                   ok=bool(arrived and found_fish))
                 
                 # Step 5: Run fishing loop
                 logger.info("Starting fishing loop...")
@@ -1151,7 +1346,8 @@ class AutoFishMultiSpotTask(DNAOneTimeTask, BaseDNATask):
                 
                 try:
                     # Run fishing loop directly (no threading needed)
-                    fish_caught = self.run_fishing_loop(max_rounds=max_rounds_per_spot, initial_total=initial_total)
+                    fish_caught = self.run_fishing_loop(max_rounds=max_rounds_per_spot, initial_total=initial_total,
+                                                        spot_name=spot_name)
                     
                     # Update totals
                     self.current_spot_fish = fish_caught
@@ -4,12 +4,11 @@ from src.tasks.BaseListenerTask import BaseListenerTask
 from src.tasks.BaseCombatTask import BaseCombatTask
 from src.tasks.BaseDNATask import BaseDNATask
 from pynput import mouse, keyboard
-import time
-import os
-import cv2
-import numpy as np
 from pathlib import Path
-from PIL import Image
+
+from src.tasks.choaga.timing import DeadlineTimer
+from src.tasks.choaga.vision import FrameContext, Template, get_template_bank
+from src.tasks.choaga.waiting import wait_until_any
 
 logger = Logger.get_logger(__name__)
 
@@ -149,28 +148,33 @@ class SkillSpeedTask(BaseListenerTask, BaseCombatTask, BaseDNATask, TriggerTask)
         # Return False to indicate this execution is done (but task stays enabled)
         return False
 
+    def combo_timer(self) -> DeadlineTimer:
+        """Deadline timer for a combo: each step is timed from the start of the combo, not from the previous sleep"""
+        return DeadlineTimer(self.sleep)
+
     def _execute_rhythm(self):
         """Rhythm technique: E -> Hold Left Click -> Right Click"""
         if not self.config.get('Enable Rhythm', True):
             return
         
         try:
+            timer = self.combo_timer()
             # Press E (skill) - use combat key directly
             combat_key = self.get_combat_key()
             self.send_key_down(combat_key)
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.send_key_up(combat_key)
-            self.sleep(self.config.get('<span style="color: #3A7FCF;">Rhythm Skill Delay</span>', 0.05))
+            timer.wait(self.config.get('<span style="color: #3A7FCF;">Rhythm Skill Delay</span>', 0.05))
             
             # Hold left click (charge attack)
             self.mouse_down(key='left')
-            self.sleep(self.config.get('<span style="color: #3A7FCF;">Rhythm Charge Duration</span>', 0.1))
+            timer.wait(self.config.get('<span style="color: #3A7FCF;">Rhythm Charge Duration</span>', 0.1))
             self.mouse_up(key='left')
             
             # Right click (shoot)
-            self.sleep(self.config.get('<span style="color: #3A7FCF;">Rhythm Shoot Delay</span>', 0.05))
+            timer.wait(self.config.get('<span style="color: #3A7FCF;">Rhythm Shoot Delay</span>', 0.05))
             self.mouse_down(key='right')
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.mouse_up(key='right')
             
             self.log_info("Rhythm technique executed")
@@ -184,16 +188,17 @@ class SkillSpeedTask(BaseListenerTask, BaseCombatTask, BaseDNATask, TriggerTask)
             return
         
         try:
+            timer = self.combo_timer()
             # Press E (skill) - use combat key directly
             combat_key = self.get_combat_key()
             self.send_key_down(combat_key)
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.send_key_up(combat_key)
-            self.sleep(self.config.get('<span style="color: #3A7FCF;">Quick Skill Cancel Delay</span>', 0.05))
+            timer.wait(self.config.get('<span style="color: #3A7FCF;">Quick Skill Cancel Delay</span>', 0.05))
             
             # Right click to cancel
             self.mouse_down(key='right')
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.mouse_up(key='right')
             
             self.log_info("Quick skill cancel executed")
@@ -209,22 +214,23 @@ class SkillSpeedTask(BaseListenerTask, BaseCombatTask, BaseDNATask, TriggerTask)
         try:
             delay = self.config.get('<span style="color: #3A7FCF;">Skill Charge Combo Delay</span>', 0.1)
             combat_key = self.get_combat_key()
+            timer = self.combo_timer()
             
             # First skill
             self.send_key_down(combat_key)
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.send_key_up(combat_key)
-            self.sleep(delay)
+            timer.wait(delay)
             
             # Charge attack
             self.mouse_down(key='left')
-            self.sleep(0.1)
+            timer.wait(0.1)
             self.mouse_up(key='left')
-            self.sleep(delay)
+            timer.wait(delay)
             
             # Second skill
             self.send_key_down(combat_key)
-            self.sleep(0.05)
+            timer.wait(0.05)
             self.send_key_up(combat_key)
             
             self.log_info("Skill charge combo executed")
@@ -242,16 +248,17 @@ class SkillSpeedTask(BaseListenerTask, BaseCombatTask, BaseDNATask, TriggerTask)
             duration = self.config.get('<span style="color: #3A7FCF;">Rapid Fire Cancel Duration</span>', 0.02)  # How long to hold right click
             
             # Hold right click
+            timer = self.combo_timer()
             self.mouse_down(key='right')
             
-            # Spam ctrl while holding right click
-            start_time = time.time()
-            while time.time() - start_time < duration:
+            # Spam ctrl while holding right click (duration counted from the press, like the baseline)
+            end_time = timer.reset() + duration
+            while timer.now() < end_time:
                 # Press and release ctrl
                 self.send_key_down('lcontrol')
-                self.sleep(0.02)
+                timer.wait(0.02)
                 self.send_key_up('lcontrol')
-                self.sleep(interval)
+                timer.wait(interval)
             
             # Release right click
             self.mouse_up(key='right')
@@ -327,63 +334,46 @@ class SkillSpeedTask(BaseListenerTask, BaseCombatTask, BaseDNATask, TriggerTask)
         # Can be extended to support mouse button activation
         pass
 
+    def vision_context(self) -> FrameContext:
+        """Per-frame vision cache (gray image, crops, match results) for the current frame"""
+        return FrameContext.of(self.frame)
+
     def find_image_template(self, template_img, threshold: float = 0.7):
         """Find template image in current frame using template matching"""
         if template_img is None:
             return None
         
-        frame = self.frame
-        if frame is None:
+        if self.frame is None:
             return None
         
-        # Convert frame to BGR if needed
-        if len(frame.shape) == 3:
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            template_gray = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
-        else:
-            frame_gray = frame
-            template_gray = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
+        # Raw BGR arrays are still accepted, but bank templates skip the per-call conversion
+        if not isinstance(template_img, Template):
+            template_img = Template("", "", template_img)
         
-        # Template matching
-        result = cv2.matchTemplate(frame_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
-        
-        if max_val >= threshold:
-            h, w = template_gray.shape[:2]
-            x = max_loc[0] + w // 2
-            y = max_loc[1] + h // 2
-            return (x, y)
+        _, match = self.vision_context().match(template_img, threshold)
+        if match:
+            x, y, w, h = match
+            return (x + w // 2, y + h // 2)
         
         return None
     
     def wait_for_png(self, png_path: str, timeout: float = 10.0):
         """Wait for PNG image to appear on screen using template matching"""
         logger.info(f"Waiting for PNG image: {png_path}")
-        deadline = time.monotonic() + timeout
         
-        # Load template image
-        if not os.path.exists(png_path):
-            logger.error(f"PNG file not found: {png_path}")
+        # Load template image (decoded once by the shared mod/fish template bank)
+        template = get_template_bank("mod/fish").get(png_path)
+        if template is None:
+            logger.error(f"PNG template not available: {png_path}")
             return None
         
-        try:
-            pil_img = Image.open(png_path)
-            img_array = np.array(pil_img)
-            template = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        except Exception as e:
-            logger.error(f"Failed to load PNG template {png_path}: {e}")
-            return None
-        
-        while time.monotonic() < deadline:
-            location = self.find_image_template(template, threshold=0.7)
-            if location:
-                image_name = Path(png_path).stem
-                logger.info(f"Found PNG image: {image_name}")
-                return location
-            self.sleep(0.2)
-            self.next_frame()
-        
+        # Checked on every new frame instead of a fixed 0.2s poll
+        result = wait_until_any(self, {"found": lambda: self.find_image_template(template, threshold=0.7)}, timeout)
         image_name = Path(png_path).stem
+        if result:
+            logger.info(f"Found PNG image: {image_name}")
+            return result.value
+        
         logger.warning(f"Timeout waiting for PNG image: {image_name}")
         return None
 